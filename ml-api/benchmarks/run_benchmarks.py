@@ -0,0 +1,319 @@
+"""
+Benchmark offline untuk hot path ml-api (tanpa DB dan tanpa model produksi).
+
+Model fixture dilatih dari dataset sintetis di src/dataset, dan semua query
+simulator diarahkan ke database in-memory. Hasil ditulis sebagai JSON agar
+bisa dibandingkan antar commit.
+
+Usage (dari folder ml-api):
+    python -m benchmarks.run_benchmarks --output before.json
+    python -m benchmarks.run_benchmarks --compare before.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+# Modul src mencetak log saat import; alihkan ke stderr agar stdout tetap JSON murni
+with contextlib.redirect_stdout(sys.stderr):
+    from src import main
+    from src.data_loader import DATASET_DIR, load_and_combine_data
+    from src.fleet_generator import FleetGenerator
+    from src.predict import MaintenanceModel, build_feature_frame
+
+FEATURES = [
+    'Type',
+    'Air temperature [K]',
+    'Process temperature [K]',
+    'Rotational speed [rpm]',
+    'Torque [Nm]',
+    'Tool wear [min]',
+    'Power',
+    'Temp_Diff',
+    'Wear_Strain',
+]
+
+SNAKE_TO_CSV = {
+    "type": "Type",
+    "air_temp": "Air temperature [K]",
+    "process_temp": "Process temperature [K]",
+    "rpm": "Rotational speed [rpm]",
+    "torque": "Torque [Nm]",
+    "tool_wear": "Tool wear [min]",
+}
+
+# Metrik yang dipakai untuk deteksi regresi (tail percentile terlalu noisy)
+GATED_METRICS = ("p50_ms", "seconds", "rows_per_sec", "peak_mb")
+# Metrik dengan arah "lebih besar lebih baik" (sisanya: lebih kecil lebih baik)
+HIGHER_IS_BETTER = ("rows_per_sec",)
+
+
+def build_fixture_model(path: str, sample_rows: int = 5000):
+    """Latih model kecil deterministik dengan struktur artifacts yang sama."""
+    df = pd.read_csv(os.path.join(DATASET_DIR, 'SYNTHETIC_TORQUE_HIGH.csv')).head(sample_rows)
+    snake = df.rename(columns={v: k for k, v in SNAKE_TO_CSV.items()})
+    X = build_feature_frame(snake)[FEATURES]
+
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    le_type = LabelEncoder().fit(df['Failure Type'])
+
+    artifacts = {
+        'model_version': 'benchmark-fixture',
+        'features_status': FEATURES,
+        'scaler': scaler,
+        'model_status': LogisticRegression(max_iter=500).fit(X_scaled, df['Machine failure']),
+        'features_type': FEATURES,
+        'scaler_type': scaler,
+        'model_type': LogisticRegression(max_iter=500).fit(X_scaled, le_type.transform(df['Failure Type'])),
+        'le_type': le_type,
+        'features_rul': FEATURES,
+        'model_rul': LinearRegression().fit(X_scaled, (240 - df['Tool wear [min]']).clip(lower=0) * 2),
+    }
+    joblib.dump(artifacts, path)
+
+
+class InMemoryDB:
+    """Pengganti fetch_statement/execute_statement untuk simulator."""
+
+    def __init__(self):
+        self.rows: Dict[str, List[tuple]] = {}
+
+    async def fetch_statement(self, name: str, *args):
+        self.rows.setdefault(name, []).append(args)
+        return [{"insertion_time": datetime.now()}]
+
+    async def execute_statement(self, name: str, *args):
+        self.rows.setdefault(name, []).append(args)
+        return "INSERT 0 1"
+
+
+def percentiles(samples_s: List[float]) -> Dict[str, float]:
+    samples_ms = sorted(s * 1000 for s in samples_s)
+    q = np.percentile(samples_ms, [50, 90, 99])
+    return {
+        "p50_ms": float(q[0]),
+        "p90_ms": float(q[1]),
+        "p99_ms": float(q[2]),
+        "mean_ms": statistics.fmean(samples_ms),
+    }
+
+
+def sample_inputs(rows: List[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
+    return [
+        {"machine_id": row["machine_id"], **{k: row[v] for k, v in SNAKE_TO_CSV.items()}}
+        for row in rows[:n]
+    ]
+
+
+def bench_make_prediction(model: MaintenanceModel, inputs: List[Dict[str, Any]], warmup: int = 20):
+    for item in inputs[:warmup]:
+        model.make_prediction(item)
+    samples = []
+    for item in inputs:
+        started = time.perf_counter()
+        model.make_prediction(item)
+        samples.append(time.perf_counter() - started)
+    return {"n": len(samples), **percentiles(samples)}
+
+
+def bench_batch(model: MaintenanceModel, inputs: List[Dict[str, Any]], sizes: List[int], repeats: int):
+    frame = pd.DataFrame(inputs)
+    results = {}
+    for size in sizes:
+        columns = {name: frame[name].to_numpy()[:size] for name in frame.columns}
+        model.predict_batch(columns)
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            model.predict_batch(columns)
+            samples.append(time.perf_counter() - started)
+        best = min(samples)
+        results[str(size)] = {**percentiles(samples), "rows_per_sec": size / best if best else 0.0}
+    return results
+
+
+def bench_load_data():
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = load_and_combine_data()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, {"rows": len(rows), "seconds": elapsed, "peak_mb": peak / (1024 * 1024)}
+
+
+def bench_load_artifacts(model_path: str, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        model = MaintenanceModel()
+        model.model_path = model_path
+        started = time.perf_counter()
+        model.load_artifacts()
+        samples.append(time.perf_counter() - started)
+    return {"n": repeats, **percentiles(samples)}
+
+
+def bench_simulator(model: MaintenanceModel, rows: List[Dict[str, Any]], n_rows: int):
+    db = InMemoryDB()
+    main.ai_engine = model
+    main.fetch_statement = db.fetch_statement
+    main.execute_statement = db.execute_statement
+    main.TIME_MAPPING_MINUTES = {"L": 0, "M": 0, "H": 0}
+    main.DATA_SIMULASI = rows[:n_rows]
+    main.reset_simulation_state()
+
+    started = time.perf_counter()
+    asyncio.run(main.run_simulation_loop())
+    elapsed = time.perf_counter() - started
+    processed = main.SIMULATION_INDEX
+    return {
+        "rows": processed,
+        "seconds": elapsed,
+        "rows_per_sec": processed / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_fleet(model: MaintenanceModel, n_machines: int, ticks: int):
+    """Throughput generator fleet dan scoring batch satu tick penuh."""
+    generator = FleetGenerator(n_machines, noise=0.01, failure_rate=0.01, seed=42)
+
+    started = time.perf_counter()
+    chunks = list(generator.iter_chunks(ticks))
+    gen_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for chunk in chunks:
+        model.predict_batch(chunk)
+    score_elapsed = time.perf_counter() - started
+
+    rows = n_machines * ticks
+    return {
+        "machines": n_machines,
+        "ticks": ticks,
+        "generate": {"seconds": gen_elapsed, "rows_per_sec": rows / gen_elapsed if gen_elapsed else 0.0},
+        "score": {"seconds": score_elapsed, "rows_per_sec": rows / score_elapsed if score_elapsed else 0.0},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args) -> Dict[str, Any]:
+    np.random.seed(42)
+    results: Dict[str, Any] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "fixture_model.pkl")
+        # Output print dari modul src dibungkam agar tidak ikut diukur di terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_fixture_model(model_path)
+
+            rows, results["load_and_combine_data"] = bench_load_data()
+            results["load_artifacts"] = bench_load_artifacts(model_path, args.repeats)
+
+            model = MaintenanceModel()
+            model.model_path = model_path
+            model.load_artifacts()
+
+            inputs = sample_inputs(rows, max(args.samples, max(args.batch_sizes)))
+            results["make_prediction"] = bench_make_prediction(model, inputs[:args.samples])
+            results["predict_batch"] = bench_batch(model, inputs, args.batch_sizes, args.repeats)
+            results["simulator"] = bench_simulator(model, rows, args.sim_rows)
+            results["fleet"] = bench_fleet(model, args.fleet_machines, args.fleet_ticks)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def _flatten(prefix: str, value: Any, out: Dict[str, float]):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, inner, out)
+    elif isinstance(value, (int, float)):
+        out[prefix] = float(value)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Bandingkan metrik latency/throughput; kembalikan daftar regresi.
+
+    Ringkasan perbandingan ditulis ke stderr agar stdout tetap JSON murni.
+    """
+    now, before = {}, {}
+    _flatten("", current["results"], now)
+    _flatten("", baseline["results"], before)
+
+    regressions = []
+    for key, old in before.items():
+        new = now.get(key)
+        if new is None or old == 0 or not key.endswith(GATED_METRICS):
+            continue
+        change = (new - old) / old
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        marker = "❌" if worse > max_regression else "  "
+        print(f"{marker} {key}: {old:.4f} -> {new:.4f} ({change:+.1%})", file=sys.stderr)
+        if worse > max_regression:
+            regressions.append(key)
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark hot path ml-api")
+    parser.add_argument("--output", help="Tulis hasil JSON ke file (default: stdout)")
+    parser.add_argument("--compare", help="File JSON baseline untuk dibandingkan")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Batas regresi relatif (0.2 = 20%%)")
+    parser.add_argument("--samples", type=int, default=500, help="Jumlah sampel make_prediction")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--sim-rows", type=int, default=500, help="Jumlah baris simulasi end-to-end")
+    parser.add_argument("--fleet-machines", type=int, default=5000, help="Jumlah mesin sintetis FleetGenerator")
+    parser.add_argument("--fleet-ticks", type=int, default=5)
+    args = parser.parse_args()
+
+    report = run(args)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+        print(f"✅ Benchmark results written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed more than {args.max_regression:.0%}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ No regressions above threshold", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main_cli()
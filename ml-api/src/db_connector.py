@@ -1,20 +1,122 @@
 # ml-api/src/db_connector.py
+import asyncio
 import asyncpg
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, Optional
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 
+from .logger import RateLimiter, logger
+
 # Load .env file
 load_dotenv()
 
 # Get DATABASE_URL from environment
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Konfigurasi pool (bisa di-override lewat environment)
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '30'))
+DB_POOL_ADAPTIVE = os.getenv('DB_POOL_ADAPTIVE', 'false').lower() in ('1', 'true', 'yes')
+# Mode adaptif: tambah limit jika rata-rata wait > GROW_WAIT_MS dalam satu window
+DB_POOL_GROW_WAIT_MS = float(os.getenv('DB_POOL_GROW_WAIT_MS', '20'))
+DB_POOL_ADAPT_WINDOW = int(os.getenv('DB_POOL_ADAPT_WINDOW', '50'))
+# Batas waktu (detik) probe health check; jauh di bawah acquire timeout biasa
+DB_HEALTH_TIMEOUT = float(os.getenv('DB_HEALTH_TIMEOUT', '2'))
+
 db_pool = None
 
+# Batas atas bucket histogram waktu tunggu acquire (ms)
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, float('inf'))
+
+
+class PoolMetrics:
+    """Histogram waktu tunggu acquire, jumlah timeout, dan koneksi in-use."""
+
+    def __init__(self):
+        self.wait_counts = [0] * len(WAIT_BUCKETS_MS)
+        self.wait_sum_ms = 0.0
+        self.acquires = 0
+        self.timeouts = 0
+        self.in_use = 0
+
+    def observe_wait(self, wait_ms: float):
+        self.acquires += 1
+        self.wait_sum_ms += wait_ms
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                self.wait_counts[i] += 1
+                break
+
+
+class AdaptivePoolLimit:
+    """
+    Batas jumlah koneksi aktif yang naik/turun antara min dan max pool.
+
+    asyncpg tidak bisa di-resize saat runtime, jadi pool dibuat dengan
+    max_size penuh dan limit ini yang menentukan berapa koneksi boleh
+    dipakai. Koneksi ekstra yang idle ditutup oleh
+    max_inactive_connection_lifetime milik asyncpg.
+    """
+
+    def __init__(self, min_size: int, max_size: int):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.limit = min_size
+        self.active = 0
+        self._cond = asyncio.Condition()
+        self._window_wait_ms = 0.0
+        self._window_count = 0
+        self._window_peak = 0
+
+    async def acquire(self, timeout: float):
+        async with self._cond:
+            await asyncio.wait_for(self._cond.wait_for(lambda: self.active < self.limit), timeout)
+            self.active += 1
+            self._window_peak = max(self._window_peak, self.active)
+
+    async def release(self):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    async def observe_wait(self, wait_ms: float):
+        self._window_wait_ms += wait_ms
+        self._window_count += 1
+        if self._window_count < DB_POOL_ADAPT_WINDOW:
+            return
+
+        avg_wait = self._window_wait_ms / self._window_count
+        peak = self._window_peak
+        self._window_wait_ms = 0.0
+        self._window_count = 0
+        self._window_peak = self.active
+
+        if avg_wait > DB_POOL_GROW_WAIT_MS and self.limit < self.max_size:
+            self.limit += 1
+            logger.info("DB pool limit raised", extra={"limit": self.limit, "avg_wait_ms": round(avg_wait, 1)})
+            async with self._cond:
+                self._cond.notify()
+        elif avg_wait < 1 and peak < self.limit - 1 and self.limit > self.min_size:
+            self.limit -= 1
+            logger.info("DB pool limit lowered", extra={"limit": self.limit})
+
+
+pool_metrics = PoolMetrics()
+pool_limit: Optional[AdaptivePoolLimit] = None
+
+# Registry statement tetap (name -> SQL) dan statistik per statement
+STATEMENTS: Dict[str, str] = {}
+STATEMENT_STATS: Dict[str, Dict[str, float]] = {}
+# Log error statement dibatasi per nama statement (DB down = error di setiap baris)
+STATEMENT_ERROR_LIMITER = RateLimiter()
+
 async def create_pool():
     """Create PostgreSQL connection pool for Railway"""
-    global db_pool
+    global db_pool, pool_limit
     
     if db_pool is not None:
         return db_pool
@@ -51,12 +153,15 @@ async def create_pool():
         # Create connection pool
         db_pool = await asyncpg.create_pool(
             **DB_CONFIG,
-            min_size=2,
-            max_size=10,
-            command_timeout=60
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            command_timeout=60,
         )
         
-        print(f"✅ Database pool created successfully")
+        if DB_POOL_ADAPTIVE:
+            pool_limit = AdaptivePoolLimit(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+
+        print(f"✅ Database pool created successfully (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE}, adaptive={DB_POOL_ADAPTIVE})")
         
         # Test connection
         async with db_pool.acquire() as conn:
@@ -71,32 +176,157 @@ async def create_pool():
 
 async def close_pool():
     """Close database connection pool"""
-    global db_pool
+    global db_pool, pool_limit
     if db_pool:
         await db_pool.close()
         db_pool = None
+        pool_limit = None
         print("✅ Database pool closed")
 
-async def execute_query(sql: str, *args):
-    """Execute query and return results"""
+@asynccontextmanager
+async def acquire_connection():
+    """Acquire koneksi dari pool sambil mencatat waktu tunggu dan timeout."""
     if db_pool is None:
         await create_pool()
-         
-    async with db_pool.acquire() as conn:
+
+    limit = pool_limit
+    started = time.perf_counter()
+    try:
+        if limit is not None:
+            await limit.acquire(DB_POOL_ACQUIRE_TIMEOUT)
+        try:
+            conn = await db_pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+        except BaseException:
+            if limit is not None:
+                await limit.release()
+            raise
+    except asyncio.TimeoutError:
+        pool_metrics.timeouts += 1
+        logger.error("DB pool acquire timeout", extra={"timeout_sec": DB_POOL_ACQUIRE_TIMEOUT})
+        raise
+
+    wait_ms = (time.perf_counter() - started) * 1000
+    pool_metrics.observe_wait(wait_ms)
+    if limit is not None:
+        await limit.observe_wait(wait_ms)
+
+    pool_metrics.in_use += 1
+    try:
+        yield conn
+    finally:
+        pool_metrics.in_use -= 1
+        await db_pool.release(conn)
+        if limit is not None:
+            await limit.release()
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Snapshot ukuran pool, koneksi in-use/idle, dan histogram wait acquire."""
+    stats: Dict[str, Any] = {
+        "initialized": db_pool is not None,
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "adaptive": DB_POOL_ADAPTIVE,
+        "in_use": pool_metrics.in_use,
+        "acquires": pool_metrics.acquires,
+        "timeouts": pool_metrics.timeouts,
+        "avg_wait_ms": pool_metrics.wait_sum_ms / pool_metrics.acquires if pool_metrics.acquires else 0.0,
+        "wait_histogram_ms": {
+            ("+Inf" if bound == float('inf') else str(bound)): count
+            for bound, count in zip(WAIT_BUCKETS_MS, pool_metrics.wait_counts)
+        },
+    }
+    if db_pool is not None:
+        stats["size"] = db_pool.get_size()
+        stats["idle"] = db_pool.get_idle_size()
+    if pool_limit is not None:
+        stats["adaptive_limit"] = pool_limit.limit
+    return stats
+
+async def execute_query(sql: str, *args):
+    """Execute query and return results"""
+    async with acquire_connection() as conn:
         try:
             return await conn.fetch(sql, *args)
         except Exception as e:
             print(f"❌ Query failed: {e}")
             raise
 
-async def check_connection():
-    """Check if database connection is healthy"""
+async def check_connection(timeout: float = DB_HEALTH_TIMEOUT):
+    """Check if database connection is healthy.
+
+    Probe langsung ke pool dengan timeout pendek, tanpa acquire_connection:
+    tidak ikut tercatat di pool_metrics dan tidak memakai slot limit adaptif.
+    """
     try:
         if db_pool is None:
             return False, "Pool not initialized"
-        
-        async with db_pool.acquire() as conn:
-            await conn.fetchval('SELECT 1')
+
+        async with db_pool.acquire(timeout=timeout) as conn:
+            await conn.fetchval('SELECT 1', timeout=timeout)
             return True, "Connected to Railway PostgreSQL"
+    except asyncio.TimeoutError:
+        return False, f"No connection available within {timeout}s (pool saturated?)"
     except Exception as e:
         return False, str(e)
+
+def register_statement(name: str, sql: str) -> str:
+    """Daftarkan SQL tetap dengan nama, untuk statistik per statement.
+
+    SQL yang sama persis selalu dipakai ulang, sehingga statement cache bawaan
+    asyncpg (per koneksi, key = teks SQL) mem-prepare-nya sekali per koneksi
+    saat pemakaian pertama; call berikutnya tidak di-parse ulang.
+    """
+    STATEMENTS[name] = sql
+    STATEMENT_STATS.setdefault(name, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+    return name
+
+def _record_statement(name: str, started: float, failed: bool):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats = STATEMENT_STATS[name]
+    stats["calls"] += 1
+    stats["total_ms"] += elapsed_ms
+    if elapsed_ms > stats["max_ms"]:
+        stats["max_ms"] = elapsed_ms
+    if failed:
+        stats["errors"] += 1
+
+async def _run_statement(method: str, name: str, *args):
+    sql = STATEMENTS[name]
+    async with acquire_connection() as conn:
+        # Latency statement saja; waktu tunggu pool tercatat di pool_metrics
+        started = time.perf_counter()
+        try:
+            result = await getattr(conn, method)(sql, *args)
+        except Exception as e:
+            _record_statement(name, started, failed=True)
+            suppressed = STATEMENT_ERROR_LIMITER.allow(name)
+            if suppressed is not None:
+                logger.error(
+                    "Statement failed",
+                    extra={"statement": name, "error": str(e), "suppressed": suppressed},
+                )
+            raise
+    _record_statement(name, started, failed=False)
+    return result
+
+async def fetch_statement(name: str, *args):
+    """Jalankan statement terdaftar dan kembalikan rows (mis. INSERT ... RETURNING)."""
+    return await _run_statement("fetch", name, *args)
+
+async def execute_statement(name: str, *args) -> str:
+    """Jalankan statement terdaftar tanpa membangun result rows."""
+    return await _run_statement("execute", name, *args)
+
+async def executemany_statement(name: str, args: Iterable[Any]):
+    """Jalankan statement terdaftar untuk banyak set argumen sekaligus."""
+    return await _run_statement("executemany", name, list(args))
+
+def get_statement_stats() -> Dict[str, Dict[str, float]]:
+    """Statistik per statement: jumlah call, error, total/avg/max latency (ms)."""
+    return {
+        name: {
+            **stats,
+            "avg_ms": stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0,
+        }
+        for name, stats in STATEMENT_STATS.items()
+    }
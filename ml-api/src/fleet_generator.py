@@ -0,0 +1,163 @@
+# ml-api/src/fleet_generator.py
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import DATASET_DIR, FILE_TO_ID_MAP
+
+# Kolom numerik CSV dan nama snake_case yang dipakai predictor
+NUMERIC_COLUMNS = [
+    'Air temperature [K]',
+    'Process temperature [K]',
+    'Rotational speed [rpm]',
+    'Torque [Nm]',
+    'Tool wear [min]',
+]
+SNAKE_COLUMNS = ['air_temp', 'process_temp', 'rpm', 'torque', 'tool_wear']
+AIR, PROCESS, RPM, TORQUE, WEAR = range(len(NUMERIC_COLUMNS))
+
+# Prefix ID mesin sintetis (mesin asli memakai "M-"); dipakai juga untuk teardown
+FLEET_ID_PREFIX = "F-"
+
+# Efek failure per skenario: (kolom, multiplier, offset) yang diterapkan selama episode
+FAILURE_EFFECTS = {
+    'SPEED_LOW': [(RPM, 0.7, 0.0)],
+    'TEMP_HIGH': [(AIR, 1.0, 4.0), (PROCESS, 1.0, 8.0)],
+    'TORQUE_HIGH': [(TORQUE, 1.4, 0.0)],
+    'WEAR_HIGH': [(WEAR, 1.0, 120.0)],
+}
+
+
+def scenario_name(filename: str) -> str:
+    """'SYNTHETIC_SPEED_LOW.csv' -> 'SPEED_LOW'"""
+    return filename.replace('SYNTHETIC_', '').replace('.csv', '')
+
+
+@lru_cache(maxsize=1)
+def load_scenario_templates() -> Dict[str, pd.DataFrame]:
+    """
+    Muat 4 CSV skenario sebagai template (hanya kolom Type + numerik).
+
+    Di-cache per proses; FleetGenerator hanya membaca template, tidak mengubahnya.
+    """
+    templates = {}
+    for filename in FILE_TO_ID_MAP:
+        file_path = os.path.join(DATASET_DIR, filename)
+        if not os.path.exists(file_path):
+            print(f"WARNING: File {filename} not found at {file_path}")
+            continue
+        templates[scenario_name(filename)] = pd.read_csv(file_path, usecols=['Type'] + NUMERIC_COLUMNS)
+    return templates
+
+
+class FleetGenerator:
+    """
+    Generator pembacaan sensor sintetis untuk ribuan mesin.
+
+    Setiap mesin diberi skenario (sesuai `scenario_mix`) dan offset acak di
+    template-nya, lalu tiap tick menghasilkan satu pembacaan per mesin secara
+    vektor: nilai template + noise Gaussian (skala std kolom * `noise`), plus
+    episode failure acak dengan peluang `failure_rate` per mesin per tick.
+    """
+
+    def __init__(
+        self,
+        n_machines: int = 1000,
+        scenario_mix: Optional[Dict[str, float]] = None,
+        noise: float = 0.01,
+        failure_rate: float = 0.0,
+        failure_duration: int = 30,
+        seed: Optional[int] = None,
+        templates: Optional[Dict[str, pd.DataFrame]] = None,
+    ):
+        templates = templates if templates is not None else load_scenario_templates()
+        if not templates:
+            raise ValueError("Tidak ada template skenario yang bisa dimuat.")
+
+        self.scenarios = list(templates)
+        mix = scenario_mix or {name: 1.0 for name in self.scenarios}
+        unknown = set(mix) - set(self.scenarios)
+        if unknown:
+            raise ValueError(f"Skenario tidak dikenal: {sorted(unknown)}. Pilihan: {self.scenarios}")
+        weights = np.array([mix.get(name, 0.0) for name in self.scenarios], dtype=float)
+        if weights.sum() <= 0:
+            raise ValueError("scenario_mix harus punya minimal satu bobot > 0.")
+
+        self.n_machines = n_machines
+        self.noise = noise
+        self.failure_rate = failure_rate
+        self.failure_duration = failure_duration
+        self.tick = 0
+        self._rng = np.random.default_rng(seed)
+
+        # Semua template digabung jadi satu array; tiap skenario punya base + length
+        frames = [templates[name] for name in self.scenarios]
+        self._values = np.concatenate([f[NUMERIC_COLUMNS].to_numpy(dtype=float) for f in frames])
+        self._types = np.concatenate([f['Type'].to_numpy(dtype=str) for f in frames])
+        self._length = np.array([len(f) for f in frames])
+        self._base = np.concatenate([[0], np.cumsum(self._length)[:-1]])
+        self._noise_scale = self._values.std(axis=0) * noise
+
+        # ID sintetis; mode simulasi yang menulis ke DB mendaftarkannya dulu ke
+        # tabel machines (FK sensor_data/prediction_results/alerts)
+        self.machine_ids = np.array([f"{FLEET_ID_PREFIX}{i:05d}" for i in range(n_machines)])
+        self.scenario_idx = self._rng.choice(len(self.scenarios), size=n_machines, p=weights / weights.sum())
+        self.offsets = self._rng.integers(0, self._length[self.scenario_idx])
+        self.failing_until = np.zeros(n_machines, dtype=np.int64)
+
+    def next_tick(self) -> Dict[str, np.ndarray]:
+        """Satu pembacaan per mesin dalam format kolumnar snake_case."""
+        length = self._length[self.scenario_idx]
+        idx = self._base[self.scenario_idx] + (self.offsets + self.tick) % length
+        values = self._values[idx]  # fancy indexing -> salinan, aman dimodifikasi
+
+        if self.noise:
+            values = values + self._rng.standard_normal(values.shape) * self._noise_scale
+
+        if self.failure_rate:
+            starting = (self.failing_until <= self.tick) & (self._rng.random(self.n_machines) < self.failure_rate)
+            self.failing_until[starting] = self.tick + self.failure_duration
+            failing = self.failing_until > self.tick
+            if failing.any():
+                for i, name in enumerate(self.scenarios):
+                    mask = failing & (self.scenario_idx == i)
+                    for column, multiplier, offset in FAILURE_EFFECTS.get(name, []):
+                        values[mask, column] = values[mask, column] * multiplier + offset
+
+        # Jaga aturan fisika/validasi yang sama dengan MachineSensorData
+        air_temp = np.maximum(values[:, AIR], 1.0)
+        process_temp = np.maximum(values[:, PROCESS], air_temp)
+        rpm = np.maximum(np.rint(values[:, RPM]), 1).astype(np.int64)
+        torque = np.maximum(values[:, TORQUE], 0.0)
+        tool_wear = np.maximum(np.rint(values[:, WEAR]), 0).astype(np.int64)
+
+        self.tick += 1
+        return {
+            "machine_id": self.machine_ids,
+            "type": self._types[idx],
+            "air_temp": np.round(air_temp, 1),
+            "process_temp": np.round(process_temp, 1),
+            "rpm": rpm,
+            "torque": np.round(torque, 1),
+            "tool_wear": tool_wear,
+        }
+
+    def iter_chunks(self, ticks: Optional[int] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Stream kolumnar per tick (untuk `predict_batch` / `/predict/batch`)."""
+        produced = 0
+        while ticks is None or produced < ticks:
+            yield self.next_tick()
+            produced += 1
+
+    def iter_rows(self, ticks: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream baris berformat header CSV (sama dengan data_loader) untuk simulator."""
+        for chunk in self.iter_chunks(ticks):
+            columns = [chunk["machine_id"].tolist(), chunk["type"].tolist()]
+            columns += [chunk[name].tolist() for name in SNAKE_COLUMNS]
+            keys = ['machine_id', 'Type'] + NUMERIC_COLUMNS
+            for values in zip(*columns):
+                yield dict(zip(keys, values))
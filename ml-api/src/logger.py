@@ -0,0 +1,169 @@
+# ml-api/src/logger.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Set
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # json | text
+# Batas log per mesin: minimal jeda (detik) antar baris, dan sampling 1 dari N
+LOG_MIN_INTERVAL_SEC = float(os.getenv('LOG_MIN_INTERVAL_SEC', '1'))
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '1'))
+# Batas global baris per detik untuk semua RateLimiter (0 = tanpa batas), agar
+# volume log tidak ikut naik dengan jumlah mesin
+LOG_MAX_LINES_PER_SEC = int(os.getenv('LOG_MAX_LINES_PER_SEC', '50'))
+
+logger = logging.getLogger("protek")
+
+_listener: Optional[QueueListener] = None
+_warned: Set[str] = set()
+_warned_lock = threading.Lock()
+
+# Atribut bawaan LogRecord; sisanya (dari `extra=`) dianggap field terstruktur
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record sebagai satu baris JSON (dijalankan di thread listener)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("[%(asctime)s] %(levelname)s %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
+        if fields:
+            line += " | " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+def setup_logging():
+    """
+    Pasang QueueHandler pada logger "protek"; formatting dan I/O stdout
+    dilakukan oleh QueueListener di thread background. Idempotent.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    logger.handlers = [QueueHandler(log_queue)]
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush sisa antrean log dan hentikan thread listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def warn_once(key: str, message: str, **fields):
+    """Log warning hanya sekali per key selama proses berjalan."""
+    if key in _warned:
+        return
+    with _warned_lock:
+        if key in _warned:
+            return
+        _warned.add(key)
+    logger.warning(message, extra=fields)
+
+
+class LineBudget:
+    """Jendela 1 detik dengan jumlah baris maksimum, dibagi semua RateLimiter."""
+
+    def __init__(self, max_per_sec: int = LOG_MAX_LINES_PER_SEC):
+        self.max_per_sec = max_per_sec
+        self._window_start = float("-inf")
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def take(self, now: float) -> bool:
+        if self.max_per_sec <= 0:
+            return True
+        with self._lock:
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._used = 0
+            if self._used >= self.max_per_sec:
+                return False
+            self._used += 1
+            return True
+
+
+# Budget global proses: batas total baris/detik di atas limit per key
+GLOBAL_LINE_BUDGET = LineBudget()
+
+
+class RateLimiter:
+    """
+    Limit log per key (mis. machine_id): sampling 1 dari `sample_every`
+    dan minimal `min_interval` detik antar baris, ditambah batas global
+    baris/detik (`budget`) yang dibagi semua limiter. Jumlah baris yang
+    di-skip dilaporkan pada baris berikutnya yang lolos.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = LOG_MIN_INTERVAL_SEC,
+        sample_every: int = LOG_SAMPLE_EVERY,
+        budget: Optional[LineBudget] = None,
+    ):
+        self.min_interval = min_interval
+        self.sample_every = max(1, sample_every)
+        self.budget = budget if budget is not None else GLOBAL_LINE_BUDGET
+        # key -> [last_emit_monotonic, seen_count, suppressed_count]
+        self._state: Dict[str, list] = {}
+
+    def allow(self, key: str) -> Optional[int]:
+        """Kembalikan jumlah baris yang di-skip sejak emit terakhir, atau None jika harus di-skip."""
+        state = self._state.get(key)
+        if state is None:
+            state = [float("-inf"), 0, 0]
+            self._state[key] = state
+
+        state[1] += 1
+        now = time.monotonic()
+        if state[1] % self.sample_every != 0 or now - state[0] < self.min_interval:
+            state[2] += 1
+            return None
+        if not self.budget.take(now):
+            state[2] += 1
+            return None
+
+        suppressed = state[2]
+        state[0] = now
+        state[2] = 0
+        return suppressed
@@ -0,0 +1,230 @@
+# ml-api/src/machine_state.py
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+import orjson
+
+# Jeda minimum (ms) antar rebuild snapshot fleet penuh
+SNAPSHOT_MIN_REBUILD_MS = float(os.getenv('MACHINE_STATE_SNAPSHOT_MS', '250'))
+# Jumlah mesin per pengambilan lock pada update_many / encode snapshot
+# (agar update lain tidak tertahan lama)
+LOCK_SLICE = 1000
+
+READING_FIELDS = ("type", "air_temp", "process_temp", "rpm", "torque", "tool_wear")
+# Urutan kolom pada blok yang dirujuk MachineState
+STATE_FIELDS = READING_FIELDS + ("risk", "rul_minutes", "status", "open_alert", "updated_at")
+_FIELD_INDEX = {name: index for index, name in enumerate(STATE_FIELDS)}
+
+
+def _as_list(values: Sequence[Any]) -> list:
+    """Array numpy -> list tipe Python (tanpa objek skalar numpy per elemen)."""
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    return orjson.dumps(payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class MachineState:
+    """
+    Snapshot terakhir satu mesin (reading, risk, RUL, status, alert aktif).
+
+    Nilainya tidak disalin per mesin: state hanya merujuk blok kolom hasil
+    scoring (satu list per field di STATE_FIELDS) dan nomor barisnya, sehingga
+    update satu tick fleet cukup dua assignment per mesin. Field bisa dibaca
+    sebagai atribut, mis. `state.open_alert`.
+    """
+
+    __slots__ = ("machine_id", "columns", "row")
+
+    def __init__(self, machine_id: str, columns: Tuple[Sequence[Any], ...], row: int):
+        self.machine_id = machine_id
+        self.columns = columns
+        self.row = row
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            index = _FIELD_INDEX[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return self.columns[index][self.row]
+
+    def to_dict(self) -> Dict[str, Any]:
+        row = self.row
+        values = [column[row] for column in self.columns]
+        risk, rul_minutes, status, open_alert, updated_at = values[len(READING_FIELDS):]
+        return {
+            "machine_id": self.machine_id,
+            "last_reading": dict(zip(READING_FIELDS, values)),
+            "risk_probability": risk,
+            "rul_minutes": rul_minutes,
+            "status": status,
+            "open_alert": open_alert,
+            "updated_at": updated_at.isoformat() if updated_at else None,
+        }
+
+
+class MachineStateTable:
+    """
+    Tabel state per mesin di memori, diperbarui oleh jalur scoring.
+
+    Setiap update menaikkan `version`; ETag = boot id proses + version agar
+    ETag dari proses sebelumnya tidak pernah cocok setelah restart. Update
+    hanya menulis slot dan menandai mesin berubah; JSON per mesin (orjson)
+    di-encode lazy oleh `snapshot()`/`get_encoded()` hanya untuk mesin yang
+    berubah, dan rebuild snapshot fleet dibatasi sekali per `min_rebuild_ms`.
+    """
+
+    def __init__(self, min_rebuild_ms: float = SNAPSHOT_MIN_REBUILD_MS):
+        self._states: Dict[str, MachineState] = {}
+        self._encoded: Dict[str, bytes] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._min_rebuild = min_rebuild_ms / 1000
+        self._cached_version = -1
+        self._cached_at = float("-inf")
+        self._cached_body = b""
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def etag_for(self, version: int) -> str:
+        return f'W/"{self._boot_id}-{version}"'
+
+    def update(
+        self,
+        features: Dict[str, Any],
+        risk: float,
+        rul_minutes: float,
+        status: str,
+        alert_message: Optional[str],
+        updated_at: Optional[datetime] = None,
+    ):
+        """Perbarui state satu mesin secara atomik dari hasil satu baris scoring."""
+
+        values = [features.get(name) for name in READING_FIELDS]
+        # Alert tetap terbuka sampai ada pembacaan non-critical berikutnya
+        values += [risk, rul_minutes, status, alert_message, updated_at or datetime.now()]
+        columns = tuple((value,) for value in values)
+        machine_id = str(features["machine_id"])
+        with self._lock:
+            self._set(machine_id, columns, 0)
+            self._dirty.add(machine_id)
+            self._version += 1
+
+    def update_many(
+        self,
+        features: Dict[str, Sequence[Any]],
+        risks: Sequence[float],
+        rul_minutes: Sequence[float],
+        statuses: Sequence[str],
+        alert_messages: Sequence[Optional[str]],
+        updated_at: Optional[datetime] = None,
+    ):
+        """Versi kolumnar `update` untuk output `predict_batch` (satu elemen per mesin)."""
+
+        machine_ids = [str(machine_id) for machine_id in _as_list(features["machine_id"])]
+        n_rows = len(machine_ids)
+        columns = tuple(_as_list(features[name]) for name in READING_FIELDS) + (
+            _as_list(risks),
+            _as_list(rul_minutes),
+            _as_list(statuses),
+            _as_list(alert_messages),
+            [updated_at or datetime.now()] * n_rows,
+        )
+        for start in range(0, n_rows, LOCK_SLICE):
+            stop = min(start + LOCK_SLICE, n_rows)
+            with self._lock:
+                for row in range(start, stop):
+                    self._set(machine_ids[row], columns, row)
+                self._dirty.update(machine_ids[start:stop])
+                self._version += stop - start
+
+    def _set(self, machine_id: str, columns: Tuple[Sequence[Any], ...], row: int):
+        """Arahkan state mesin ke baris `row` pada blok `columns`; panggil di bawah lock."""
+        state = self._states.get(machine_id)
+        if state is None:
+            self._states[machine_id] = MachineState(machine_id, columns, row)
+        else:
+            state.columns = columns
+            state.row = row
+
+    def _encode(self, machine_id: str):
+        """Encode ulang JSON satu mesin yang berubah; panggil di bawah lock."""
+        self._encoded[machine_id] = _dumps(self._states[machine_id].to_dict())
+        self._dirty.discard(machine_id)
+
+    def get(self, machine_id: str) -> Optional[MachineState]:
+        return self._states.get(machine_id)
+
+    def get_encoded(self, machine_id: str) -> Optional[bytes]:
+        """JSON satu mesin; di-encode ulang hanya jika berubah sejak encode terakhir."""
+        with self._lock:
+            if machine_id in self._dirty:
+                self._encode(machine_id)
+            return self._encoded.get(machine_id)
+
+    def remove_prefix(self, prefix: str) -> int:
+        """Hapus state semua mesin yang ID-nya diawali `prefix`; kembalikan jumlahnya."""
+        with self._lock:
+            machine_ids = [machine_id for machine_id in self._states if machine_id.startswith(prefix)]
+            for machine_id in machine_ids:
+                del self._states[machine_id]
+                self._encoded.pop(machine_id, None)
+                self._dirty.discard(machine_id)
+            if machine_ids:
+                self._version += 1
+            return len(machine_ids)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._encoded.clear()
+            self._dirty.clear()
+            self._version += 1
+
+    def snapshot(self) -> Tuple[str, bytes]:
+        """
+        Kembalikan (etag, body JSON) untuk seluruh mesin.
+
+        Jika snapshot terakhir lebih muda dari `min_rebuild_ms`, snapshot itu
+        dipakai apa adanya (ETag ikut versi snapshot, bukan versi terbaru).
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            stale = self._cached_version != self._version
+            if not stale or now - self._cached_at < self._min_rebuild:
+                return self.etag_for(self._cached_version), self._cached_body
+
+        # Encode delta per slice; lock dilepas antar slice agar update() tidak tertahan
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    version = self._version
+                    parts = list(self._encoded.values())
+                    break
+                for machine_id in list(islice(self._dirty, LOCK_SLICE)):
+                    self._encode(machine_id)
+
+        # Penggabungan bytes dilakukan di luar lock agar update() tidak tertahan
+        body = b'{"version":%d,"machines":[%s]}' % (version, b",".join(parts))
+        with self._lock:
+            if version >= self._cached_version:
+                self._cached_version = version
+                self._cached_body = body
+                self._cached_at = now
+        return self.etag_for(version), body
+
+
+# Instance global yang dipakai simulator dan endpoint
+machine_states = MachineStateTable()
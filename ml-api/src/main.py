@@ -1,19 +1,47 @@
 import asyncio
+import logging
 import os
+import time
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Dict, Iterable, List, Literal, Optional
 
+import numpy as np
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, model_validator
 
 # Import komponen MLOps
-from .db_connector import create_pool, db_pool, execute_query
+from .db_connector import (
+    check_connection,
+    close_pool,
+    create_pool,
+    execute_statement,
+    executemany_statement,
+    fetch_statement,
+    get_pool_stats,
+    get_statement_stats,
+    register_statement,
+)
 from .data_loader import load_and_combine_data
+from .fleet_generator import FLEET_ID_PREFIX, FleetGenerator
+from .machine_state import machine_states
+from . import profiling
+from .logger import RateLimiter, logger, setup_logging, shutdown_logging
+from .metrics import (
+    PIPELINE_ERRORS,
+    PIPELINE_STAGE_SECONDS,
+    ROWS_PROCESSED,
+    RequestLatencyMiddleware,
+    monitor_event_loop_lag,
+    render_metrics,
+)
 
 # Import class dari file predict.py (Asumsi: MaintenanceModel memiliki method make_prediction)
-from src.predict import MaintenanceModel
+from src.predict import MaintenanceModel, PredictionResult, PredStatus, failure_action
 
 # --- MLOPS SIMULATION CONFIGURATION ---
 # Waktu jeda simulasi dalam menit (real-time)
@@ -22,16 +50,23 @@ TIME_MAPPING_MINUTES = {"L": 2, "M": 3, "H": 5}
 # Status Simulasi Global
 DATA_SIMULASI: List[Dict[str, Any]] = []
 SIMULATION_TASK: Optional[asyncio.Task] = None
+LOOP_LAG_TASK: Optional[asyncio.Task] = None
 SIMULATION_INDEX: int = 0
+# Total baris sumber simulasi aktif (None = pakai len(DATA_SIMULASI))
+SIMULATION_TOTAL: Optional[int] = None
 IS_RUNNING: bool = False
 
+# Batas jumlah baris per request /predict/batch
+BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', '10000'))
+
 
-def reset_simulation_state():
+def reset_simulation_state(total_rows: Optional[int] = None):
     """Reset indeks dan flag simulasi sebelum dijalankan."""
 
-    global IS_RUNNING, SIMULATION_INDEX
+    global IS_RUNNING, SIMULATION_INDEX, SIMULATION_TOTAL
     IS_RUNNING = True
     SIMULATION_INDEX = 0
+    SIMULATION_TOTAL = total_rows
 
 # --- 1. Inisialisasi App & Model ---
 app = FastAPI(title="PROTEK AI SERVICE (MLOPS SIMULATOR)", version="2.0 (Full MLOps)")
@@ -56,21 +91,70 @@ async def perform_feature_engineering(row: Dict[str, Any]):
     }
 
 
-async def insert_sensor_row(row: Dict[str, Any]):
-    """Sisipkan data sensor mentah dan kembalikan insertion_time."""
-
-    sql_insert = """
+# --- Statement SQL tetap simulator (di-prepare asyncpg sekali per koneksi lewat statement cache) ---
+SQL_INSERT_SENSOR = register_statement(
+    "insert_sensor_data",
+    """
         INSERT INTO sensor_data (machine_id, type, air_temperature_k,
             process_temperature_k, rotational_speed_rpm, torque_nm,
             tool_wear_min)
         VALUES ($1, $2, $3, $4, $5, $6, $7) RETURNING insertion_time;
+    """,
+)
+
+SQL_INSERT_PREDICTION = register_statement(
+    "insert_prediction_result",
     """
+        INSERT INTO prediction_results (
+            machine_id,
+            risk_probability,
+            rul_estimate,
+            rul_status,
+            rul_minutes_val,
+            pred_status,
+            failure_type,
+            action,
+            urgency,
+            prediction_time
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10);
+    """,
+)
+
+SQL_INSERT_ALERT = register_statement(
+    "insert_alert",
+    """
+        INSERT INTO alerts (machine_id, message, severity, "timestamp")
+        VALUES ($1, $2, $3, $4);
+    """,
+)
+
+# Mesin sintetis FleetGenerator harus ada di tabel machines sebelum data sensornya
+# ditulis (FK machine_id). updated_at tidak punya default di DB (@updatedAt Prisma).
+SQL_REGISTER_MACHINE = register_statement(
+    "register_fleet_machine",
+    """
+        INSERT INTO machines (machine_id, name, updated_at)
+        VALUES ($1, $2, NOW())
+        ON CONFLICT (machine_id) DO NOTHING;
+    """,
+)
+
+# Teardown data fleet sintetis: tabel anak dulu, baru machines (urutan FK)
+SQL_TEARDOWN_FLEET = [
+    (table, register_statement(f"delete_fleet_{table}", f"DELETE FROM {table} WHERE machine_id LIKE $1;"))
+    for table in ("alerts", "prediction_results", "sensor_data", "machines")
+]
+
+
+async def insert_sensor_row(row: Dict[str, Any]):
+    """Sisipkan data sensor mentah dan kembalikan insertion_time."""
 
     # Use machine_id string directly
     machine_id_str = row["machine_id"]
 
-    inserted_records = await execute_query(
-        sql_insert,
+    inserted_records = await fetch_statement(
+        SQL_INSERT_SENSOR,
         machine_id_str,  # String machine ID
         row["Type"],  # Machine type (L, M, H)
         row["Air temperature [K]"],
@@ -83,151 +167,159 @@ async def insert_sensor_row(row: Dict[str, Any]):
     return inserted_records[0]["insertion_time"]
 
 
-def extract_prediction_metrics(prediction_result: Dict[str, Any], fallback_row: Dict[str, Any]):
-    """Normalisasi hasil prediksi (snake_case) ke format angka dan string aman."""
-
-    machine_id = prediction_result.get("machine_id", fallback_row.get("machine_id"))
-    risk_str = prediction_result.get("risk_probability", "0%")
-    try:
-        risk_val = float(str(risk_str).replace("%", "")) / 100.0
-    except Exception:
-        risk_val = 0.0
-
-    rul_estimate = prediction_result.get("rul_estimate", "")
-    rul_status = prediction_result.get("rul_status", "")
-    try:
-        rul_minutes = float(prediction_result.get("rul_minutes", 0))
-    except Exception:
-        rul_minutes = 0.0
-
-    status_text = prediction_result.get("status", "")
-    failure_type = prediction_result.get("failure_type", "")
-    action = prediction_result.get("action", "")
-    urgency = prediction_result.get("urgency", "")
-
-    return (
-        machine_id,
-        risk_str,
-        risk_val,
-        rul_estimate,
-        rul_status,
-        rul_minutes,
-        status_text,
-        failure_type,
-        action,
-        urgency,
-    )
-
-
-def log_prediction(machine_id: Any, risk_str: str, rul_estimate: str, rul_status: str, rul_minutes: float):
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    print(
-        f"[{timestamp}] Sim Mesin {machine_id} | "
-        f"Risk: {risk_str} | RUL: {rul_estimate} | "
-        f"Status: {rul_status} | RUL_Min: {rul_minutes:.1f}"
+# Rate limit log per mesin agar biaya logging tetap saat throughput naik
+PREDICTION_LOG_LIMITER = RateLimiter()
+ALERT_LOG_LIMITER = RateLimiter()
+
+
+def log_prediction(result: PredictionResult):
+    suppressed = PREDICTION_LOG_LIMITER.allow(result.machine_id)
+    if suppressed is None or not logger.isEnabledFor(logging.INFO):
+        return
+    logger.info(
+        "Sim prediction",
+        extra={
+            "machine_id": result.machine_id,
+            "risk": round(result.risk, 4),
+            "rul_minutes": round(result.rul_minutes, 1),
+            "rul_status": result.rul_status.name,
+            "status": result.status.name,
+            "suppressed": suppressed,
+        },
     )
 
 # --- FUNGSI SIMULASI UTAMA (Background Task) ---
-async def run_simulation_loop():
+async def run_simulation_loop(
+    rows: Optional[Iterable[Dict[str, Any]]] = None,
+    row_interval_sec: Optional[float] = None,
+):
+    """
+    Jalankan simulasi baris demi baris. Default sumbernya DATA_SIMULASI (CSV)
+    dengan jeda sesuai TIME_MAPPING_MINUTES; sumber lain (mis. FleetGenerator)
+    bisa dialirkan secara lazy lewat `rows` dengan jeda `row_interval_sec`.
+    """
     global SIMULATION_TASK, IS_RUNNING, SIMULATION_INDEX
+
+    if rows is None:
+        rows = DATA_SIMULASI
     
-    while SIMULATION_INDEX < len(DATA_SIMULASI):
-        row = DATA_SIMULASI[SIMULATION_INDEX]
-        minutes = TIME_MAPPING_MINUTES.get(row['Type'], 2)
-        sleep_time = minutes * 10
+    for row in rows:
+        if row_interval_sec is None:
+            minutes = TIME_MAPPING_MINUTES.get(row['Type'], 2)
+            sleep_time = minutes * 10
+        else:
+            sleep_time = row_interval_sec
+
+        # Profiling opt-in: N baris berikutnya (cProfile) atau sampling span.
+        # Span mencakup seluruh baris; cProfile hanya di stage prediksi (sync),
+        # agar coroutine lain yang jalan selama await DB tidak ikut terekam.
+        profile_row = profiling.take_simulation_row()
+        trace = None
+        if profile_row or profiling.should_sample():
+            trace = profiling.begin_trace(
+                f"simulation_row:{SIMULATION_INDEX}", profile=profile_row, profile_now=False
+            )
         
         try:
             # 1) Injeksi data mentah ke DB
-            insertion_time = await insert_sensor_row(row)
+            with PIPELINE_STAGE_SECONDS.time("insert_sensor_row", "simulation", ai_engine.model_version):
+                insertion_time = await insert_sensor_row(row)
 
             # 2) Feature engineering
-            features_for_prediction = await perform_feature_engineering(row)
+            with PIPELINE_STAGE_SECONDS.time("feature_engineering", "simulation", ai_engine.model_version):
+                features_for_prediction = await perform_feature_engineering(row)
 
             # 3) Prediksi (Inference)
-            prediction_result = ai_engine.make_prediction(features_for_prediction)
-            (
-                machine_id,
-                risk_str,
-                risk_val,
-                rul_estimate,
-                rul_status,
-                rul_minutes,
-                status_text,
-                failure_type,
-                action_text,
-                urgency_text,
-            ) = extract_prediction_metrics(prediction_result, row)
+            with PIPELINE_STAGE_SECONDS.time("make_prediction", "simulation", ai_engine.model_version) as timer:
+                with profiling.profile_section(trace):
+                    prediction = ai_engine.predict_result(features_for_prediction)
+                # Versi dibaca setelah prediksi (model bisa baru di-load lazy di dalamnya)
+                model_version = ai_engine.model_version
+                timer.relabel("make_prediction", "simulation", model_version)
+            machine_id = prediction.machine_id
+            status_text = prediction.status_text
+            failure_type = prediction.failure_type
+            action_text = prediction.action
+            urgency_text = prediction.urgency_text
 
             # 4) Simpan hasil prediksi
-            sql_predict = """
-                INSERT INTO prediction_results (
-                    machine_id,
-                    risk_probability,
-                    rul_estimate,
-                    rul_status,
-                    rul_minutes_val,
-                    pred_status,
+            # Pengecualian "teks hanya di HTTP": kolom prediction_results (schema
+            # Prisma) bertipe String dan dibaca dashboard apa adanya, jadi teks
+            # dirender di sini untuk insert DB.
+            with PIPELINE_STAGE_SECONDS.time("insert_prediction", "simulation", model_version):
+                # Use machine_id string directly
+                await execute_statement(
+                    SQL_INSERT_PREDICTION,
+                    str(machine_id),  # String machine ID
+                    prediction.risk,  # Float value, not string
+                    prediction.rul_estimate,
+                    prediction.rul_status_text,
+                    prediction.rul_minutes,
+                    status_text,
                     failure_type,
-                    action,
-                    urgency,
-                    prediction_time
+                    action_text,
+                    urgency_text,
+                    insertion_time,
                 )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10);
-            """
-            # Use machine_id string directly
-            await execute_query(
-                sql_predict,
-                str(machine_id),  # String machine ID
-                risk_val,  # Float value, not string
-                rul_estimate,
-                rul_status,
-                rul_minutes,
-                status_text,
-                failure_type,
-                action_text,
-                urgency_text,
-                insertion_time,
-            )
 
             # --- [BARU] 5) Buat Alert Otomatis Jika Critical ---
-            # Logika: Jika urgency High atau Status Critical, masukkan ke tabel alerts
-            # Ini setara dengan: if (newStatus === MachineStatus.CRITICAL)
-            
-            is_critical = (urgency_text.upper() == "HIGH") or (status_text.upper() == "CRITICAL")
-            
-            if is_critical:
+            # Logika: alert hanya dibuat saat mesin MASUK ke status failure.
+            # Selama mesin tetap failure, alert yang sudah terbuka dipakai ulang
+            # (tanpa insert baru); pembacaan normal menutupnya.
+            # (urgency hanya terisi saat status FAILURE, jadi cukup cek enum status)
+            is_critical = prediction.status == PredStatus.FAILURE
+            previous_state = machine_states.get(str(machine_id))
+            open_alert = previous_state.open_alert if previous_state is not None else None
+            alert_message = open_alert if is_critical else None
+
+            if is_critical and open_alert is None:
                 alert_message = f"Deteksi Bahaya: {failure_type}. Tindakan: {action_text}"
                 
-                # Query Insert Alert
-                sql_alert = """
-                    INSERT INTO alerts (machine_id, message, severity, created_at)
-                    VALUES ($1, $2, $3, $4);
-                """
-                
-                # Eksekusi Query
-                await execute_query(
-                    sql_alert,
-                    str(machine_id),
-                    alert_message,
-                    "HIGH",          # Severity fixed to HIGH for critical
-                    insertion_time   # Gunakan waktu yang sama dengan data sensor
-                )
+                with PIPELINE_STAGE_SECONDS.time("insert_alert", "simulation", model_version):
+                    # Eksekusi Query Insert Alert
+                    await execute_statement(
+                        SQL_INSERT_ALERT,
+                        str(machine_id),
+                        alert_message,
+                        "HIGH",          # Severity fixed to HIGH for critical
+                        insertion_time   # Gunakan waktu yang sama dengan data sensor
+                    )
                 
-                # Optional Log untuk debug
-                print(f"   >>> [ALERT TRIGGERED] Machine: {machine_id} | Msg: {alert_message}")
-
+                # Optional Log untuk debug (rate-limited per mesin)
+                suppressed = ALERT_LOG_LIMITER.allow(str(machine_id))
+                if suppressed is not None:
+                    logger.warning(
+                        "Alert triggered",
+                        extra={"machine_id": machine_id, "alert": alert_message, "suppressed": suppressed},
+                    )
+
+
+            # 6) Perbarui state terakhir mesin di memori
+            machine_states.update(
+                features_for_prediction,
+                prediction.risk,
+                prediction.rul_minutes,
+                prediction.status.name,
+                alert_message,
+                insertion_time,
+            )
 
-            # 6) Logging ringkas
-            log_prediction(machine_id, risk_str, rul_estimate, rul_status, rul_minutes)
+            # 7) Logging ringkas
+            log_prediction(prediction)
+            ROWS_PROCESSED.inc("simulation", model_version)
 
         except asyncio.CancelledError:
             print("Simulasi dibatalkan.")
             break
         except Exception as e:
+            PIPELINE_ERRORS.inc("simulation")
             print(f"ERROR SIMULASI di index {SIMULATION_INDEX}: {e}")
             import traceback
             traceback.print_exc()
             break # Berhenti jika terjadi error fatal
+        finally:
+            if trace is not None:
+                profiling.end_trace(trace)
 
         SIMULATION_INDEX += 1
         await asyncio.sleep(sleep_time)
@@ -237,6 +329,72 @@ async def run_simulation_loop():
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Simulasi Selesai. Total rows: {SIMULATION_INDEX}")
 
 
+def score_fleet_tick(generator: FleetGenerator) -> int:
+    """
+    Generate satu tick fleet, scoring lewat predict_batch, lalu perbarui state
+    mesin. Murni CPU, dijalankan di thread worker. Kembalikan jumlah baris.
+    """
+    chunk = generator.next_tick()
+    result = ai_engine.predict_batch(chunk)
+    alerts = [
+        f"Deteksi Bahaya: {failure_type}. Tindakan: {failure_action(failure_type)}" if status == "FAILURE" else None
+        for status, failure_type in zip(result["status"], result["failure_type"])
+    ]
+    machine_states.update_many(chunk, result["risk_probability"], result["rul_minutes"], result["status"], alerts)
+    return len(result["machine_id"])
+
+
+async def run_fleet_simulation(generator: FleetGenerator, ticks: int, mode: str, interval_sec: float):
+    """
+    Jalankan simulasi fleet.
+
+    - mode "rows" (opt-in write_db): tiap baris lewat pipeline penuh
+      run_simulation_loop (insert sensor, prediksi, hasil, alert ke DB). Mesin
+      sintetis didaftarkan dulu ke tabel machines agar FK terpenuhi, dan dihapus
+      lagi lewat DELETE /api/simulation/fleet; `interval_sec` = jeda antar baris.
+    - mode "batch": satu tick per panggilan predict_batch di thread worker, hasil
+      hanya ke state mesin + metrik (tanpa tulis DB); `interval_sec` = jeda antar tick.
+    """
+    global SIMULATION_TASK, IS_RUNNING, SIMULATION_INDEX
+
+    if mode == "rows":
+        try:
+            machine_ids = generator.machine_ids.tolist()
+            await executemany_statement(SQL_REGISTER_MACHINE, ((mid, f"Fleet {mid}") for mid in machine_ids))
+        except Exception:
+            PIPELINE_ERRORS.inc("simulation")
+            logger.exception("Fleet machine registration failed", extra={"machines": len(generator.machine_ids)})
+            IS_RUNNING = False
+            SIMULATION_TASK = None
+            return
+        await run_simulation_loop(generator.iter_rows(ticks), row_interval_sec=interval_sec)
+        return
+
+    for _ in range(ticks):
+        if not IS_RUNNING:
+            break
+        try:
+            with PIPELINE_STAGE_SECONDS.time("predict_batch", "fleet", ai_engine.model_version) as timer:
+                processed = await asyncio.to_thread(score_fleet_tick, generator)
+                model_version = ai_engine.model_version
+                timer.relabel("predict_batch", "fleet", model_version)
+        except asyncio.CancelledError:
+            logger.info("Fleet simulation cancelled", extra={"tick": generator.tick})
+            break
+        except Exception:
+            PIPELINE_ERRORS.inc("fleet")
+            logger.exception("Fleet simulation tick failed", extra={"tick": generator.tick})
+            break
+
+        ROWS_PROCESSED.inc("fleet", model_version, amount=processed)
+        SIMULATION_INDEX += processed
+        await asyncio.sleep(interval_sec)
+
+    IS_RUNNING = False
+    SIMULATION_TASK = None
+    logger.info("Fleet simulation finished", extra={"rows": SIMULATION_INDEX})
+
+
 # --- 2. Schema Data (Validasi) ---
 class MachineSensorData(BaseModel):
     # Sesuaikan Pydantic dengan skema data yang Anda gunakan di FE (misalnya, jika Anda ingin menguji API secara langsung)
@@ -257,6 +415,58 @@ class MachineSensorData(BaseModel):
             raise ValueError("process_temp harus >= air_temp")
         return self
 
+
+SENSOR_COLUMNS = ("machine_id", "type", "air_temp", "process_temp", "rpm", "torque", "tool_wear")
+
+
+def validate_sensor_columns(payload: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Validasi batch kolumnar (satu array per field) secara vektor.
+
+    Aturan sama dengan MachineSensorData, tanpa membuat objek per baris.
+    """
+    missing = [name for name in SENSOR_COLUMNS if name not in payload]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ada: {missing}")
+
+    try:
+        columns = {
+            "machine_id": np.asarray(payload["machine_id"], dtype=str),
+            "type": np.asarray(payload["type"], dtype=str),
+            "air_temp": np.asarray(payload["air_temp"], dtype=float),
+            "process_temp": np.asarray(payload["process_temp"], dtype=float),
+            "rpm": np.asarray(payload["rpm"], dtype=float),
+            "torque": np.asarray(payload["torque"], dtype=float),
+            "tool_wear": np.asarray(payload["tool_wear"], dtype=float),
+        }
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Tipe data kolom tidak valid: {e}")
+
+    lengths = {name: col.shape for name, col in columns.items()}
+    if len({shape for shape in lengths.values()}) != 1 or columns["rpm"].ndim != 1:
+        raise ValueError(f"Semua kolom harus array 1D dengan panjang sama: {lengths}")
+
+    checks = {
+        "type harus L, M, atau H": ~np.isin(columns["type"], ["L", "M", "H"]),
+        "air_temp harus > 0": ~(columns["air_temp"] > 0),
+        "process_temp harus > 0": ~(columns["process_temp"] > 0),
+        "rpm harus bilangan bulat > 0": ~(columns["rpm"] > 0) | (columns["rpm"] % 1 != 0),
+        "torque harus >= 0": ~(columns["torque"] >= 0),
+        "tool_wear harus bilangan bulat >= 0": ~(columns["tool_wear"] >= 0) | (columns["tool_wear"] % 1 != 0),
+        "process_temp harus >= air_temp": columns["process_temp"] < columns["air_temp"],
+    }
+    errors = [
+        {"rule": rule, "rows": np.flatnonzero(mask)[:20].tolist()}
+        for rule, mask in checks.items()
+        if mask.any()
+    ]
+    if errors:
+        raise ValueError(errors)
+
+    columns["rpm"] = columns["rpm"].astype(np.int64)
+    columns["tool_wear"] = columns["tool_wear"].astype(np.int64)
+    return columns
+
 # --- Setup App & Events ---
 
 # Setup CORS (Agar bisa diakses Web/Flutter)
@@ -267,10 +477,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# Latency per endpoint (middleware ASGI murni, tanpa overhead BaseHTTPMiddleware)
+app.add_middleware(RequestLatencyMiddleware)
+
 # Load model, DB Pool, dan Data Simulasi saat aplikasi menyala
 @app.on_event("startup")
 async def startup_event_unified():
-    global DATA_SIMULASI
+    global DATA_SIMULASI, LOOP_LAG_TASK
+    setup_logging()
+
     # 1. Load Model
     try:
         ai_engine.load_artifacts()
@@ -288,16 +504,21 @@ async def startup_event_unified():
         print(f"⚠️ Database connection failed: {e}")
         print("✅ API ready (demo mode - no database)")
     
+    # 4. Monitor lag event loop untuk /metrics
+    LOOP_LAG_TASK = asyncio.create_task(monitor_event_loop_lag())
+
     print("✅ API ready for simulation!")
 
 @app.on_event("shutdown")
 async def shutdown_event_unified():
-    if db_pool:
-        await db_pool.close()
+    await close_pool()
     global SIMULATION_TASK
+    if LOOP_LAG_TASK and not LOOP_LAG_TASK.done():
+        LOOP_LAG_TASK.cancel()
     if SIMULATION_TASK and not SIMULATION_TASK.done():
         SIMULATION_TASK.cancel()
         print("Simulasi dihentikan saat shutdown.")
+    shutdown_logging()
 
 # --- 3. Endpoint Dasar ---
 @app.get("/")
@@ -312,7 +533,7 @@ async def start_simulation():
     if IS_RUNNING:
         raise HTTPException(status_code=400, detail="Simulasi sudah berjalan.")
 
-    reset_simulation_state()
+    reset_simulation_state(total_rows=len(DATA_SIMULASI))
     
     print(f"[{datetime.now().strftime('%H:%M:%S')}] SIMULASI DIMULAI - Creating async task")
     
@@ -321,6 +542,86 @@ async def start_simulation():
     
     return {"status": "success", "message": "Simulasi data realtime dimulai!"}
 
+class FleetSimulationConfig(BaseModel):
+    machines: int = Field(1000, gt=0, le=100_000)
+    ticks: int = Field(100, gt=0)
+    noise: float = Field(0.01, ge=0)
+    failure_rate: float = Field(0.0, ge=0, le=1)
+    failure_duration: int = Field(30, gt=0)
+    scenario_mix: Optional[Dict[str, float]] = Field(None, example={"TORQUE_HIGH": 0.5, "WEAR_HIGH": 0.5})
+    seed: Optional[int] = None
+    # batch: predict_batch per tick, tanpa DB (default);
+    # rows: pipeline per baris yang menulis ke DB bersama, wajib opt-in write_db=true
+    mode: Literal["rows", "batch"] = "batch"
+    write_db: bool = False
+    # Jeda antar baris (mode rows) atau antar tick (mode batch)
+    row_interval_sec: float = Field(0.0, ge=0)
+
+@app.post("/api/simulation/fleet/start")
+async def start_fleet_simulation(config: FleetSimulationConfig):
+    """Simulasi load test: stream pembacaan sintetis untuk banyak mesin dari FleetGenerator."""
+    global SIMULATION_TASK, IS_RUNNING
+
+    if IS_RUNNING:
+        raise HTTPException(status_code=400, detail="Simulasi sudah berjalan.")
+    if config.mode == "rows" and not config.write_db:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                "Mode rows menulis mesin sintetis dan datanya ke database bersama; "
+                "set write_db=true untuk opt-in (bersihkan lewat DELETE /api/simulation/fleet)."
+            ),
+        )
+
+    # Tandai berjalan sebelum await agar request start paralel ditolak
+    reset_simulation_state(total_rows=config.machines * config.ticks)
+    try:
+        # Muat template CSV (sekali per proses) dan bangun state awal di luar event loop
+        generator = await asyncio.to_thread(
+            FleetGenerator,
+            n_machines=config.machines,
+            scenario_mix=config.scenario_mix,
+            noise=config.noise,
+            failure_rate=config.failure_rate,
+            failure_duration=config.failure_duration,
+            seed=config.seed,
+        )
+    except ValueError as e:
+        IS_RUNNING = False
+        raise HTTPException(status_code=422, detail=str(e))
+
+    logger.info(
+        "Fleet simulation started",
+        extra={"machines": config.machines, "ticks": config.ticks, "mode": config.mode},
+    )
+
+    SIMULATION_TASK = asyncio.create_task(
+        run_fleet_simulation(generator, config.ticks, config.mode, config.row_interval_sec)
+    )
+
+    return {
+        "status": "success",
+        "message": f"Simulasi fleet dimulai untuk {config.machines} mesin.",
+        "total_rows": config.machines * config.ticks,
+    }
+
+@app.delete("/api/simulation/fleet")
+async def teardown_fleet_simulation():
+    """Hapus mesin sintetis FleetGenerator beserta datanya dari DB dan state di memori."""
+    if IS_RUNNING:
+        raise HTTPException(status_code=400, detail="Hentikan simulasi sebelum teardown.")
+
+    cleared = machine_states.remove_prefix(FLEET_ID_PREFIX)
+    deleted = {}
+    try:
+        for table, statement in SQL_TEARDOWN_FLEET:
+            status = await execute_statement(statement, f"{FLEET_ID_PREFIX}%")
+            deleted[table] = int(status.split()[-1])
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Teardown DB gagal (state memori sudah dibersihkan): {e}")
+
+    return {"status": "success", "machine_states_cleared": cleared, "deleted_rows": deleted}
+
 @app.get("/api/simulation/stop")
 async def stop_simulation():
     global SIMULATION_TASK, IS_RUNNING
@@ -334,7 +635,7 @@ async def stop_simulation():
 @app.get("/api/simulation/status")
 async def get_simulation_status():
     """Mendapatkan status simulasi yang sedang berjalan."""
-    total_rows = len(DATA_SIMULASI)
+    total_rows = SIMULATION_TOTAL if SIMULATION_TOTAL is not None else len(DATA_SIMULASI)
     progress = 0
     if total_rows > 0 and SIMULATION_INDEX > 0:
         progress = (SIMULATION_INDEX / total_rows) * 100
@@ -348,24 +649,169 @@ async def get_simulation_status():
     }
 
 
+# --- 4b. Endpoint State Mesin (in-memory, tanpa query DB) ---
+@app.get("/api/machines/state")
+async def get_machines_state(request: Request):
+    """State terakhir seluruh mesin dari memori, dengan dukungan ETag."""
+    # Join bytes untuk fleet besar (puluhan ms) dijalankan di luar event loop
+    etag, body = await asyncio.to_thread(machine_states.snapshot)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/api/machines/{machine_id}/state")
+async def get_machine_state(machine_id: str):
+    """State terakhir satu mesin dari memori."""
+    body = machine_states.get_encoded(machine_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Mesin belum punya state.")
+    return Response(content=body, media_type="application/json")
+
+
+
+@app.get("/api/db/statements")
+async def get_db_statement_stats():
+    """Jumlah call dan latency per statement SQL terdaftar."""
+    return get_statement_stats()
+
+
+@app.get("/api/db/pool")
+async def get_db_pool():
+    """Metrik pool (in-use, idle, wait, timeout) tanpa mengambil koneksi."""
+    return get_pool_stats()
+
+
+@app.get("/api/db/health")
+async def get_db_health():
+    """Status koneksi DB plus metrik pool (in-use, idle, wait, timeout)."""
+    # Snapshot pool diambil sebelum probe agar tetap terlapor saat pool penuh
+    pool = get_pool_stats()
+    connected, message = await check_connection()
+    return {"connected": connected, "message": message, "pool": pool}
+
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrik latency stage/endpoint, jumlah baris, error, dan lag event loop (format Prometheus)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # --- 5. Endpoint Prediksi Asli (untuk pengujian/penggunaan langsung) ---
 @app.post("/predict")
-def predict_maintenance_api(data: MachineSensorData):
+def predict_maintenance_api(data: MachineSensorData, request: Request):
+    # Header "X-Profile: 1" hanya berlaku jika profiling diaktifkan admin
+    profile = profiling.config.enabled and request.headers.get("x-profile") == "1"
+    if profile or profiling.should_sample():
+        trace_context = profiling.traced("/predict", profile=profile)
+    else:
+        trace_context = nullcontext()
+
     try:
         # Konversi Pydantic object ke Python Dict
         input_data = data.model_dump()
         
         # Panggil fungsi di predict.py (Ini akan menjalankan FE internal)
-        prediction_result = ai_engine.make_prediction(input_data)
+        with trace_context as trace:
+            with PIPELINE_STAGE_SECONDS.time("make_prediction", "predict", ai_engine.model_version) as timer:
+                prediction = ai_engine.predict_result(input_data)
+                # Versi dibaca setelah prediksi (model bisa baru di-load lazy di dalamnya)
+                model_version = ai_engine.model_version
+                timer.relabel("make_prediction", "predict", model_version)
+        ROWS_PROCESSED.inc("predict", model_version)
         
-        return prediction_result
+        # Teks dirender hanya di sini (HTTP edge)
+        response = ORJSONResponse(prediction.to_dict())
+        if trace is not None:
+            response.headers["X-Trace-Id"] = trace.trace_id
+        return response
 
     except Exception as e:
+        PIPELINE_ERRORS.inc("predict")
         import traceback
         error_detail = traceback.format_exc()
         print(f"ERROR DETAIL:\n{error_detail}")
         raise HTTPException(status_code=500, detail="Internal Server Error during prediction.")
 
+
+# --- 6. Endpoint Prediksi Batch (kolumnar) ---
+@app.post("/predict/batch")
+async def predict_batch_api(request: Request):
+    """
+    Scoring bulk dengan payload JSON kolumnar, misalnya
+    {"machine_id": [...], "type": [...], "air_temp": [...], ...}.
+    Hasil juga dikembalikan per kolom.
+    """
+    try:
+        payload = orjson.loads(await request.body())
+        if not isinstance(payload, dict):
+            raise ValueError("Payload harus object JSON dengan satu array per field.")
+        # Cek batas baris sebelum konversi/validasi agar payload besar ditolak murah
+        n_rows = len(payload.get("machine_id") or ())
+        if n_rows > BATCH_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch berisi {n_rows} baris, maksimum {BATCH_MAX_ROWS} per request.",
+            )
+        columns = validate_sensor_columns(payload)
+    except (orjson.JSONDecodeError, TypeError, ValueError) as e:
+        detail = e.args[0] if e.args else str(e)
+        raise HTTPException(status_code=422, detail=detail)
+
+    if len(columns["machine_id"]) == 0:
+        result_columns = ("machine_id", "risk_probability", "rul_minutes", "rul_status", "status", "failure_type", "urgency")
+        return ORJSONResponse({name: [] for name in result_columns})
+
+    try:
+        with PIPELINE_STAGE_SECONDS.time("predict_batch", "batch", ai_engine.model_version) as timer:
+            result = await asyncio.to_thread(ai_engine.predict_batch, columns)
+            model_version = ai_engine.model_version
+            timer.relabel("predict_batch", "batch", model_version)
+        ROWS_PROCESSED.inc("batch", model_version, amount=len(columns["machine_id"]))
+        return ORJSONResponse(result)
+    except Exception:
+        PIPELINE_ERRORS.inc("batch")
+        logger.exception("Batch prediction failed", extra={"rows": len(columns["machine_id"])})
+        raise HTTPException(status_code=500, detail="Internal Server Error during batch prediction.")
+
+
+# --- 7. Endpoint Admin Profiling ---
+class ProfilingUpdate(BaseModel):
+    enabled: Optional[bool] = None
+    trace_sample_rate: Optional[float] = Field(None, ge=0, le=1)
+    profile_simulation_rows: Optional[int] = Field(None, ge=0)
+
+
+@app.get("/api/admin/profiling")
+async def get_profiling_config():
+    return profiling.config.to_dict()
+
+
+@app.post("/api/admin/profiling")
+async def update_profiling_config(update: ProfilingUpdate):
+    """Aktifkan profiling, atur sampling span, atau profile N baris simulasi berikutnya."""
+    if update.enabled is not None:
+        profiling.config.enabled = update.enabled
+    if update.trace_sample_rate is not None:
+        profiling.config.trace_sample_rate = update.trace_sample_rate
+    if update.profile_simulation_rows is not None:
+        profiling.config.profile_rows_remaining = update.profile_simulation_rows
+    return profiling.config.to_dict()
+
+
+@app.get("/api/admin/profiling/traces")
+async def list_traces():
+    return [trace.summary() for trace in reversed(profiling.RECENT_TRACES)]
+
+
+@app.get("/api/admin/profiling/traces/{trace_id}")
+async def get_trace_detail(trace_id: str):
+    trace = profiling.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace tidak ditemukan.")
+    return {**trace.summary(), "profile": trace.profile_report}
+
 # Entry point untuk debugging lokal
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
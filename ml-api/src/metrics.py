@@ -0,0 +1,201 @@
+# ml-api/src/metrics.py
+
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Bucket default (detik) untuk latency stage pipeline dan endpoint
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape_label(value) -> str:
+    """Escape nilai label sesuai text format Prometheus (\\, \", newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        # Salin di bawah lock: inc() juga dipanggil dari threadpool (endpoint sync)
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class _Timer:
+    """Context manager pengukur durasi; label `outcome` diisi ok/error otomatis."""
+
+    __slots__ = ("histogram", "labelvalues", "started")
+
+    def __init__(self, histogram: "Histogram", labelvalues: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def relabel(self, *labelvalues):
+        """Ganti labelvalues sebelum blok selesai (mis. model_version setelah lazy load)."""
+        self.labelvalues = labelvalues
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "error" if exc_type is not None else "ok"
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues, outcome)
+        return False
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labelvalues -> [count per bucket (+Inf terakhir), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0]
+                self._series[labelvalues] = series
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labelvalues) -> _Timer:
+        """Ukur durasi blok `with`; labelvalues tanpa label outcome terakhir."""
+        return _Timer(self, labelvalues)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labelvalues, list(counts), total) for labelvalues, (counts, total) in self._series.items()]
+        for labelvalues, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "protek_pipeline_stage_seconds",
+    "Latency per stage pipeline scoring.",
+    ("stage", "source", "model_version", "outcome"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "protek_http_request_seconds",
+    "Latency per endpoint HTTP.",
+    ("endpoint", "method", "outcome"),
+)
+ROWS_PROCESSED = Counter(
+    "protek_rows_processed_total",
+    "Jumlah baris sensor yang sudah di-scoring.",
+    ("source", "model_version"),
+)
+PIPELINE_ERRORS = Counter(
+    "protek_pipeline_errors_total",
+    "Jumlah error pada pipeline scoring.",
+    ("source",),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "protek_event_loop_lag_seconds",
+    "Keterlambatan event loop dibanding jadwal sleep.",
+    buckets=LAG_BUCKETS,
+)
+
+REGISTRY = [
+    PIPELINE_STAGE_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    ROWS_PROCESSED,
+    PIPELINE_ERRORS,
+    EVENT_LOOP_LAG_SECONDS,
+]
+
+
+def render_metrics() -> str:
+    """Render semua metrik dalam Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestLatencyMiddleware:
+    """
+    Middleware ASGI murni: catat latency per endpoint ke HTTP_REQUEST_SECONDS.
+
+    Label endpoint memakai template route (mis. /api/admin/profiling/traces/{trace_id})
+    yang diisi router ke scope, agar jumlah series tidak meledak.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            endpoint = route.path if route is not None else "unmatched"
+            outcome = "ok" if status_code < 500 else "error"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, scope["method"], outcome)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Background task: ukur selisih waktu bangun vs jadwal sleep."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = time.perf_counter() - started - interval
+        EVENT_LOOP_LAG_SECONDS.observe(max(lag, 0.0))
@@ -1,11 +1,168 @@
 
+import numpy as np
 import pandas as pd
 import joblib
 import os
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict, List
+
+from .logger import logger, warn_once
+from .profiling import span
+
+
+class PredStatus(IntEnum):
+    NORMAL = 0
+    FAILURE = 1
+
+
+class RulStatus(IntEnum):
+    SAFE = 0
+    WARNING = 1
+    CRITICAL = 2
+
+
+class Urgency(IntEnum):
+    NONE = 0
+    URGENT = 1
+    VERY_URGENT = 2
+
+
+RUL_STATUS_TEXT = {
+    RulStatus.SAFE: "✅ SAFE",
+    RulStatus.WARNING: "⚠️ WARNING",
+    RulStatus.CRITICAL: "🚨 CRITICAL",
+}
+
+PRED_STATUS_TEXT = {
+    PredStatus.NORMAL: "✅ NORMAL",
+    PredStatus.FAILURE: "⚠️ CRITICAL FAILURE DETECTED",
+}
+
+URGENCY_TEXT = {
+    Urgency.NONE: "",
+    Urgency.URGENT: "⚠️ MENDESAK - Maintenance diperlukan dalam 1 jam!",
+    Urgency.VERY_URGENT: "🚨 SANGAT MENDESAK - Hentikan operasi dalam < 30 menit!",
+}
+
+
+def failure_action(fail_name: str) -> str:
+    """Rekomendasi tindakan untuk satu jenis kerusakan."""
+    if "Power" in fail_name:
+        return "Cek tegangan listrik & kurangi beban RPM."
+    elif "Heat" in fail_name:
+        return "Periksa coolant & ventilasi segera."
+    elif "Tool" in fail_name:
+        return "Jadwalkan penggantian tool segera."
+    elif "Overstrain" in fail_name:
+        return "Kurangi torsi dan periksa beban kerja mesin."
+    return "Lakukan inspeksi menyeluruh."
+
+
+@dataclass(slots=True)
+class PredictionResult:
+    """
+    Hasil prediksi bertipe (angka + kode enum).
+
+    Teks untuk manusia (emoji, pesan Bahasa Indonesia) hanya dirender saat
+    diakses lewat property atau `to_dict()` di sisi HTTP.
+    """
+
+    machine_id: str
+    risk: float
+    rul_minutes: float
+    rul_status: RulStatus
+    status: PredStatus
+    failure_code: int = -1
+    failure_type: str = ""
+    urgency: Urgency = Urgency.NONE
+
+    @property
+    def hours_left(self) -> float:
+        return self.rul_minutes / 60
+
+    @property
+    def rul_estimate(self) -> str:
+        if self.hours_left < 1:
+            return f"{int(self.rul_minutes)} Menit Lagi"
+        return f"{self.hours_left:.1f} Jam Lagi"
+
+    @property
+    def rul_status_text(self) -> str:
+        return RUL_STATUS_TEXT[self.rul_status]
+
+    @property
+    def status_text(self) -> str:
+        return PRED_STATUS_TEXT[self.status]
+
+    @property
+    def urgency_text(self) -> str:
+        return URGENCY_TEXT[self.urgency]
+
+    @property
+    def action(self) -> str:
+        if self.status == PredStatus.NORMAL:
+            return ""
+        return failure_action(self.failure_type)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Render ke format respons lama `/predict` (kompatibel dengan backend)."""
+        rul_message = self.rul_estimate
+        result = {
+            "machine_id": self.machine_id,
+            "risk_probability": round(self.risk, 4),
+            "rul_estimate": rul_message,
+            "rul_status": self.rul_status_text,
+            "rul_minutes": f"{self.rul_minutes:.0f}",
+            "status": self.status_text,
+        }
+
+        if self.status == PredStatus.NORMAL:
+            result['message'] = f"Mesin beroperasi normal. Estimasi sisa umur: {rul_message}"
+
+            # Preventive warning jika RUL rendah meskipun status normal
+            if self.hours_left < 4:
+                result['recommendation'] = f"⚠️ Tool wear approaching limit. Schedule maintenance dalam {rul_message}."
+        else:
+            result['failure_type'] = self.failure_type
+            result['action'] = self.action
+            if self.urgency != Urgency.NONE:
+                result['urgency'] = self.urgency_text
+
+        return result
+
+
+def build_feature_frame(input_df: pd.DataFrame) -> pd.DataFrame:
+    """Tambahkan fitur fisika dan rename kolom snake_case ke header dataset."""
+    # Map type to numeric
+    type_map = {'L': 0, 'M': 1, 'H': 2}
+    input_df['type_num'] = input_df['type'].map(type_map)
+
+    # Physics features (snake_case)
+    input_df['power'] = input_df['torque'] * input_df['rpm']
+    input_df['temp_diff'] = input_df['process_temp'] - input_df['air_temp']
+    input_df['wear_strain'] = input_df['tool_wear'] * input_df['torque']
+
+    # Rename snake_case into dataset-friendly names (CSV headers)
+    rename_dict = {
+        'air_temp': 'Air temperature [K]',
+        'process_temp': 'Process temperature [K]',
+        'rpm': 'Rotational speed [rpm]',
+        'torque': 'Torque [Nm]',
+        'tool_wear': 'Tool wear [min]',
+        'type_num': 'Type',            # numeric encoded
+        'power': 'Power',
+        'temp_diff': 'Temp_Diff',
+        'wear_strain': 'Wear_Strain',
+    }
+    input_df = input_df.rename(columns=rename_dict)
+    return input_df
+
 
 class MaintenanceModel:
     def __init__(self):
         self.artifacts = None
+        self.model_version = "unknown"
         # models folder is in src/models/, not at project root
         base_path = os.path.dirname(os.path.abspath(__file__))
         self.model_path = os.path.join(base_path, "models", "maintenance_brain.pkl")
@@ -17,6 +174,7 @@ class MaintenanceModel:
         if os.path.exists(self.model_path):
             try:
                 self.artifacts = joblib.load(self.model_path)
+                self.model_version = self._resolve_model_version()
                 print(f"✅ [Predict Logic] Model loaded from: {self.model_path}")
                 
                 # Debug: Print available keys
@@ -33,15 +191,13 @@ class MaintenanceModel:
             print(f"📁 Please ensure model file exists at: {self.model_path}")
             return False
 
-    def make_prediction(self, input_data: dict):
-        """
-        Fungsi prediksi dengan Enhanced RUL Model (Regression-based).
-        
-        Improvements:
-        - RUL sekarang diprediksi menggunakan ML model (tidak lagi static threshold)
-        - Consider operating conditions (Torque, RPM, Temperature, dll)
-        - Lebih accurate dalam estimasi remaining useful life
-        """
+    def _resolve_model_version(self) -> str:
+        """Versi model dari artifacts jika ada, jika tidak dari mtime file .pkl."""
+        if isinstance(self.artifacts, dict) and self.artifacts.get('model_version'):
+            return str(self.artifacts['model_version'])
+        return f"mtime-{int(os.path.getmtime(self.model_path))}"
+
+    def _ensure_loaded(self):
         # --- FITUR BARU: LAZY LOADING (PENGAMAN) ---
         # Jika model belum ada (None), coba load sekarang secara paksa
         if self.artifacts is None:
@@ -50,35 +206,8 @@ class MaintenanceModel:
             if not success:
                 raise Exception(f"FATAL: File model tidak ditemukan di {self.model_path}. Cek struktur folder!")
 
-        # ==========================================
-        # 1. PREPROCESSING
-        # ==========================================
-        # Use snake_case input, then map to expected feature names
-        input_df = pd.DataFrame([input_data])
-
-        # Map type to numeric
-        type_map = {'L': 0, 'M': 1, 'H': 2}
-        input_df['type_num'] = input_df['type'].map(type_map)
-
-        # Physics features (snake_case)
-        input_df['power'] = input_df['torque'] * input_df['rpm']
-        input_df['temp_diff'] = input_df['process_temp'] - input_df['air_temp']
-        input_df['wear_strain'] = input_df['tool_wear'] * input_df['torque']
-
-        # Rename snake_case into dataset-friendly names (CSV headers)
-        rename_dict = {
-            'air_temp': 'Air temperature [K]',
-            'process_temp': 'Process temperature [K]',
-            'rpm': 'Rotational speed [rpm]',
-            'torque': 'Torque [Nm]',
-            'tool_wear': 'Tool wear [min]',
-            'type_num': 'Type',            # numeric encoded
-            'power': 'Power',
-            'temp_diff': 'Temp_Diff',
-            'wear_strain': 'Wear_Strain',
-        }
-        input_df = input_df.rename(columns=rename_dict)
-
+    def _check_artifacts(self):
+        """Validasi key artifacts dan kembalikan (has_rul_model, has_type_model)."""
         # Validasi artifacts (flexible untuk backward compatibility)
         # Only check critical keys
         required_keys_status = ['features_status', 'scaler', 'model_status']
@@ -92,9 +221,34 @@ class MaintenanceModel:
         has_type_model = 'model_type' in self.artifacts and 'features_type' in self.artifacts
         
         if not has_rul_model:
-            print("⚠️ RUL model not found. Will use rule-based estimation.")
+            warn_once("missing_rul_model", "⚠️ RUL model not found. Will use rule-based estimation.")
         if not has_type_model:
-            print("⚠️ Failure type model not found. Will use rule-based detection.")
+            warn_once("missing_type_model", "⚠️ Failure type model not found. Will use rule-based detection.")
+
+        return has_rul_model, has_type_model
+
+    def make_prediction(self, input_data: dict):
+        """Prediksi dalam format dict lama (teks dirender dari PredictionResult)."""
+        return self.predict_result(input_data).to_dict()
+
+    def predict_result(self, input_data: dict) -> PredictionResult:
+        """
+        Fungsi prediksi dengan Enhanced RUL Model (Regression-based).
+        
+        Improvements:
+        - RUL sekarang diprediksi menggunakan ML model (tidak lagi static threshold)
+        - Consider operating conditions (Torque, RPM, Temperature, dll)
+        - Lebih accurate dalam estimasi remaining useful life
+        """
+        self._ensure_loaded()
+
+        # ==========================================
+        # 1. PREPROCESSING
+        # ==========================================
+        # Use snake_case input, then map to expected feature names
+        with span("preprocess"):
+            input_df = build_feature_frame(pd.DataFrame([input_data]))
+        has_rul_model, has_type_model = self._check_artifacts()
 
         # ==========================================
         # 2. ENHANCED RUL PREDICTION (ML-based or fallback)
@@ -105,91 +259,141 @@ class MaintenanceModel:
                 X_input_rul = input_df[self.artifacts['features_rul']]
                 
                 # Check if separate scaler exists for RUL
-                if 'scaler_rul' in self.artifacts:
-                    X_scaled_rul = self.artifacts['scaler_rul'].transform(X_input_rul)
-                else:
-                    X_scaled_rul = self.artifacts['scaler'].transform(X_input_rul)
+                with span("scaler_rul"):
+                    if 'scaler_rul' in self.artifacts:
+                        X_scaled_rul = self.artifacts['scaler_rul'].transform(X_input_rul)
+                    else:
+                        X_scaled_rul = self.artifacts['scaler'].transform(X_input_rul)
                 
-                remaining_mins = self.artifacts['model_rul'].predict(X_scaled_rul)[0]
+                with span("model_rul"):
+                    remaining_mins = self.artifacts['model_rul'].predict(X_scaled_rul)[0]
                 remaining_mins = max(0, remaining_mins)
             except Exception as e:
-                print(f"⚠️ RUL prediction error: {e}. Using fallback method.")
+                warn_once(f"rul_error:{type(e).__name__}", f"⚠️ RUL prediction error: {e}. Using fallback method.")
                 remaining_mins = self._calculate_rul_fallback(input_df)
         else:
             # Fallback: Rule-based RUL estimation
             remaining_mins = self._calculate_rul_fallback(input_df)
         
+        remaining_mins = float(remaining_mins)
         hours_left = remaining_mins / 60
 
-        # Format RUL message
         if hours_left < 1:
-            rul_message = f"{int(remaining_mins)} Menit Lagi"
-            rul_status = "🚨 CRITICAL"
+            rul_status = RulStatus.CRITICAL
         elif hours_left < 4:
-            rul_message = f"{hours_left:.1f} Jam Lagi"
-            rul_status = "⚠️ WARNING"
+            rul_status = RulStatus.WARNING
         else:
-            rul_message = f"{hours_left:.1f} Jam Lagi"
-            rul_status = "✅ SAFE"
+            rul_status = RulStatus.SAFE
 
         # ==========================================
         # 3. PREDIKSI STATUS (Normal vs Failure)
         # ==========================================
         X_input_status = input_df[self.artifacts['features_status']]
-        X_scaled_status = self.artifacts['scaler'].transform(X_input_status)
+        with span("scaler_status"):
+            X_scaled_status = self.artifacts['scaler'].transform(X_input_status)
         
-        status = self.artifacts['model_status'].predict(X_scaled_status)[0]
-        prob = self.artifacts['model_status'].predict_proba(X_scaled_status)[0][1]
+        with span("model_status"):
+            status = self.artifacts['model_status'].predict(X_scaled_status)[0]
+            prob = self.artifacts['model_status'].predict_proba(X_scaled_status)[0][1]
 
         # ==========================================
         # 4. SIAPKAN OUTPUT
         # ==========================================
-        result = {
-            "machine_id": input_data.get('machine_id', 'Unknown'),
-            "risk_probability": round(prob, 4),
-            "rul_estimate": rul_message,
-            "rul_status": rul_status,
-            "rul_minutes": f"{remaining_mins:.0f}"
-        }
+        result = PredictionResult(
+            machine_id=input_data.get('machine_id', 'Unknown'),
+            risk=float(prob),
+            rul_minutes=remaining_mins,
+            rul_status=rul_status,
+            status=PredStatus.NORMAL if status == 0 else PredStatus.FAILURE,
+        )
 
-        if status == 0:
-            result['status'] = "✅ NORMAL"
-            result['message'] = f"Mesin beroperasi normal. Estimasi sisa umur: {rul_message}"
-            
-            # Preventive warning jika RUL rendah meskipun status normal
-            if hours_left < 4:
-                result['recommendation'] = f"⚠️ Tool wear approaching limit. Schedule maintenance dalam {rul_message}."
-        else:
-            result['status'] = "⚠️ CRITICAL FAILURE DETECTED"
+        if result.status == PredStatus.FAILURE:
+            # Prediksi jenis kerusakan (sama seperti predict_batch: kosong jika model tipe tidak ada)
+            if has_type_model:
+                X_input_type = input_df[self.artifacts['features_type']]
+                with span("scaler_type"):
+                    X_scaled_type = self.artifacts['scaler_type'].transform(X_input_type)
 
-            # Prediksi jenis kerusakan
-            X_input_type = input_df[self.artifacts['features_type']]
-            X_scaled_type = self.artifacts['scaler_type'].transform(X_input_type)
-            
-            type_code = self.artifacts['model_type'].predict(X_scaled_type)[0]
-            fail_name = self.artifacts['le_type'].inverse_transform([type_code])[0]
-            result['failure_type'] = fail_name
-
-            # Rekomendasi Action
-            if "Power" in fail_name: 
-                result['action'] = "Cek tegangan listrik & kurangi beban RPM."
-            elif "Heat" in fail_name: 
-                result['action'] = "Periksa coolant & ventilasi segera."
-            elif "Tool" in fail_name: 
-                result['action'] = "Jadwalkan penggantian tool segera."
-            elif "Overstrain" in fail_name:
-                result['action'] = "Kurangi torsi dan periksa beban kerja mesin."
-            else: 
-                result['action'] = "Lakukan inspeksi menyeluruh."
+                with span("model_type"):
+                    type_code = self.artifacts['model_type'].predict(X_scaled_type)[0]
+                result.failure_code = int(type_code)
+                result.failure_type = str(self.artifacts['le_type'].inverse_transform([type_code])[0])
 
             # Enhanced urgency based on RUL
             if remaining_mins < 30:
-                result['urgency'] = "🚨 SANGAT MENDESAK - Hentikan operasi dalam < 30 menit!"
+                result.urgency = Urgency.VERY_URGENT
             elif remaining_mins < 60:
-                result['urgency'] = "⚠️ MENDESAK - Maintenance diperlukan dalam 1 jam!"
+                result.urgency = Urgency.URGENT
 
         return result
 
+    def predict_batch(self, columns: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+        """
+        Prediksi batch dari input kolumnar (satu array per field, snake_case).
+
+        Semua transformasi scaler dan model dipanggil sekali untuk seluruh
+        batch; hasil dikembalikan juga dalam format kolumnar.
+        """
+        self._ensure_loaded()
+
+        input_df = build_feature_frame(pd.DataFrame(columns))
+        has_rul_model, has_type_model = self._check_artifacts()
+        n_rows = len(input_df)
+
+        # RUL (ML-based atau fallback vektor)
+        if has_rul_model:
+            try:
+                X_input_rul = input_df[self.artifacts['features_rul']]
+                scaler_rul = self.artifacts.get('scaler_rul', self.artifacts['scaler'])
+                remaining_mins = self.artifacts['model_rul'].predict(scaler_rul.transform(X_input_rul))
+                remaining_mins = np.maximum(0, remaining_mins).astype(float)
+            except Exception as e:
+                warn_once(f"rul_error:{type(e).__name__}", f"⚠️ RUL prediction error: {e}. Using fallback method.")
+                remaining_mins = self._calculate_rul_fallback_batch(input_df)
+        else:
+            remaining_mins = self._calculate_rul_fallback_batch(input_df)
+
+        hours_left = remaining_mins / 60
+        rul_status = np.where(
+            hours_left < 1, RulStatus.CRITICAL, np.where(hours_left < 4, RulStatus.WARNING, RulStatus.SAFE)
+        )
+
+        # Status (Normal vs Failure)
+        X_scaled_status = self.artifacts['scaler'].transform(input_df[self.artifacts['features_status']])
+        status = np.asarray(self.artifacts['model_status'].predict(X_scaled_status)) != 0
+        prob = self.artifacts['model_status'].predict_proba(X_scaled_status)[:, 1]
+
+        # Jenis kerusakan hanya untuk baris yang failure
+        failure_type = np.full(n_rows, "", dtype=object)
+        if status.any() and has_type_model:
+            failed = input_df.loc[status, self.artifacts['features_type']]
+            type_codes = self.artifacts['model_type'].predict(self.artifacts['scaler_type'].transform(failed))
+            failure_type[status] = self.artifacts['le_type'].inverse_transform(type_codes)
+
+        # Urgency hanya butuh status + RUL, tidak bergantung pada model tipe
+        urgency = np.full(n_rows, Urgency.NONE, dtype=np.int8)
+        urgency[status & (remaining_mins < 60)] = Urgency.URGENT
+        urgency[status & (remaining_mins < 30)] = Urgency.VERY_URGENT
+
+        status_names = np.array([s.name for s in PredStatus])
+        rul_status_names = np.array([s.name for s in RulStatus])
+        urgency_names = np.array([s.name for s in Urgency])
+
+        if 'machine_id' in input_df:
+            machine_ids = input_df['machine_id'].astype(str).tolist()
+        else:
+            machine_ids = ['Unknown'] * n_rows
+
+        return {
+            "machine_id": machine_ids,
+            "risk_probability": np.round(prob, 4).tolist(),
+            "rul_minutes": np.round(remaining_mins).tolist(),
+            "rul_status": rul_status_names[rul_status].tolist(),
+            "status": status_names[status.astype(np.int8)].tolist(),
+            "failure_type": failure_type.tolist(),
+            "urgency": urgency_names[urgency].tolist(),
+        }
+
     def _calculate_rul_fallback(self, input_df: pd.DataFrame) -> int:
         """
         Fallback RUL calculation using rule-based estimation when ML model unavailable.
@@ -234,9 +438,42 @@ class MaintenanceModel:
             estimated_hours = max(0.5, min(24, estimated_hours))
             estimated_mins = int(estimated_hours * 60)
             
-            return int(estimated_hours), estimated_mins
+            return estimated_mins
             
         except Exception as e:
-            print(f"⚠️ [RUL Fallback] Error in calculation: {e}")
+            logger.warning(f"⚠️ [RUL Fallback] Error in calculation: {e}")
             # Return conservative estimate
             return 240
+
+    def _calculate_rul_fallback_batch(self, input_df: pd.DataFrame) -> np.ndarray:
+        """Versi vektor dari `_calculate_rul_fallback` (menit per baris)."""
+        n_rows = len(input_df)
+
+        def column(name, default):
+            if name in input_df:
+                return input_df[name].to_numpy(dtype=float)
+            return np.full(n_rows, default, dtype=float)
+
+        tool_wear = column('Tool wear [min]', 0)
+        temp_k = column('Process temperature [K]', 298)
+        rpm = column('Rotational speed [rpm]', 1500)
+        torque = column('Torque [Nm]', 40)
+
+        max_tool_wear = 240
+        wear_factor = np.maximum(0, (max_tool_wear - tool_wear) / max_tool_wear)
+
+        temp_stress = np.clip((temp_k - 295) / 15, 0, 1)
+        temp_factor = 1 - (temp_stress * 0.3)
+
+        rpm_stress = np.where(
+            rpm < 1200, (1200 - rpm) / 1200 * 0.2, np.where(rpm > 2400, (rpm - 2400) / 1000 * 0.2, 0)
+        )
+        rpm_factor = 1 - np.minimum(0.3, rpm_stress)
+
+        torque_stress = np.maximum(0, (torque - 40) / 40 * 0.2)
+        torque_factor = 1 - np.minimum(0.2, torque_stress)
+
+        base_hours = 8
+        estimated_hours = base_hours * wear_factor * temp_factor * rpm_factor * torque_factor
+        estimated_hours = np.clip(estimated_hours, 0.5, 24)
+        return (estimated_hours * 60).astype(int).astype(float)
@@ -0,0 +1,202 @@
+# ml-api/src/profiling.py
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Konfigurasi awal dari environment (bisa diubah lewat endpoint admin)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+PROFILE_HISTORY = int(os.getenv('PROFILE_HISTORY', '20'))
+PROFILE_TOP_N = 30
+
+
+class ProfilingConfig:
+    __slots__ = ("enabled", "trace_sample_rate", "profile_rows_remaining")
+
+    def __init__(self):
+        self.enabled = PROFILING_ENABLED
+        self.trace_sample_rate = TRACE_SAMPLE_RATE
+        self.profile_rows_remaining = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "trace_sample_rate": self.trace_sample_rate,
+            "profile_rows_remaining": self.profile_rows_remaining,
+        }
+
+
+class Trace:
+    """Satu request/baris simulasi yang di-trace: daftar span + laporan cProfile opsional."""
+
+    __slots__ = (
+        "trace_id",
+        "name",
+        "started_at",
+        "duration_ms",
+        "spans",
+        "profiler",
+        "profile_report",
+        "_started",
+        "_token",
+    )
+
+    def __init__(self, name: str, profile: bool):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.spans: List[Tuple[str, float]] = []
+        self.profiler = cProfile.Profile() if profile else None
+        self.profile_report = None
+        self._started = time.perf_counter()
+        self._token = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": [{"name": name, "duration_ms": ms} for name, ms in self.spans],
+            "has_profile": self.profile_report is not None,
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.spans.append((self.name, (time.perf_counter() - self.started) * 1000))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("protek_current_trace", default=None)
+# Jumlah trace aktif; jika 0, span() langsung mengembalikan no-op tanpa lookup contextvar
+_active_traces = 0
+_active_lock = threading.Lock()
+
+config = ProfilingConfig()
+RECENT_TRACES: Deque[Trace] = deque(maxlen=PROFILE_HISTORY)
+
+
+def span(name: str):
+    """Span ringan di dalam trace aktif; no-op jika tidak ada trace."""
+    if not _active_traces:
+        return _NOOP_SPAN
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def should_sample() -> bool:
+    """Sampling span-only trace; selalu False jika profiling dimatikan."""
+    if not config.enabled:
+        return False
+    rate = config.trace_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+def take_simulation_row() -> bool:
+    """True jika baris simulasi berikutnya harus di-profile (sisa kuota N baris)."""
+    if config.profile_rows_remaining <= 0:
+        return False
+    config.profile_rows_remaining -= 1
+    return True
+
+
+def begin_trace(name: str, profile: bool = False, profile_now: bool = True) -> Trace:
+    """
+    Mulai trace di context saat ini; cProfile ikut jalan jika profile=True.
+
+    Dengan profile_now=False profiler hanya disiapkan dan baru aktif di dalam
+    `profile_section`, untuk trace yang melewati await (cProfile bersifat
+    per thread, jadi akan ikut merekam coroutine lain selama await).
+    """
+    global _active_traces
+    trace = Trace(name, profile)
+    trace._token = _current_trace.set(trace)
+    with _active_lock:
+        _active_traces += 1
+    if trace.profiler is not None and profile_now:
+        trace.profiler.enable()
+    return trace
+
+
+@contextmanager
+def profile_section(trace: Optional[Trace]):
+    """Aktifkan cProfile milik trace hanya selama blok sync (tanpa await) ini."""
+    profiler = trace.profiler if trace is not None else None
+    if profiler is None:
+        yield
+        return
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+
+def end_trace(trace: Trace):
+    """Tutup trace, render laporan cProfile, dan simpan ke RECENT_TRACES."""
+    global _active_traces
+    if trace.profiler is not None:
+        trace.profiler.disable()
+        # Profiler bisa belum pernah aktif (baris gagal sebelum profile_section)
+        if trace.profiler.getstats():
+            buffer = io.StringIO()
+            pstats.Stats(trace.profiler, stream=buffer).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+            trace.profile_report = buffer.getvalue()
+        trace.profiler = None
+
+    trace.duration_ms = (time.perf_counter() - trace._started) * 1000
+    _current_trace.reset(trace._token)
+    with _active_lock:
+        _active_traces -= 1
+    RECENT_TRACES.append(trace)
+
+
+@contextmanager
+def traced(name: str, profile: bool = False):
+    trace = begin_trace(name, profile)
+    try:
+        yield trace
+    finally:
+        end_trace(trace)
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    for trace in RECENT_TRACES:
+        if trace.trace_id == trace_id:
+            return trace
+    return None